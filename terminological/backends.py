@@ -0,0 +1,287 @@
+"""
+The backends module defines the interface terminological draws through and the screens that
+implement it besides curses itself. Curses windows already provide this interface, so they are used
+as they are; everything else subclasses Screen.
+"""
+import os
+import sys
+import curses
+from collections import deque
+
+from .grid import NO_COLOR
+from .utils import char_width, string_width
+
+
+class Screen(object):
+    """The subset of the curses window interface that terminological relies on, plus the curses
+       module level color pair functions."""
+    color_pairs = 0
+
+    def getmaxyx(self):
+        raise NotImplementedError()
+
+    def addstr(self, row, col, string, attr=0):
+        raise NotImplementedError()
+
+    def inch(self, row, col):
+        raise NotImplementedError()
+
+    def getch(self):
+        return -1
+
+    def contents(self):
+        """Returns the characters on the screen, one string per row."""
+        raise NotImplementedError()
+
+    def init_pair(self, pair, foreground, background):
+        pass
+
+    def color_pair(self, pair):
+        return 0
+
+    def clear(self):
+        pass
+
+    def begin(self):
+        """Called by start() before anything is drawn on the screen."""
+
+    def end(self):
+        """Called by start() once the screen is no longer used."""
+
+    def refresh(self):
+        self.noutrefresh()
+        self.doupdate()
+
+    def noutrefresh(self):
+        pass
+
+    def doupdate(self):
+        pass
+
+
+class FrameStats(object):
+    """What a screen was asked to do between two updates of the terminal."""
+    def __init__(self):
+        self.calls = 0
+        self.cells = 0
+        self.bytes = 0
+
+    def __repr__(self):
+        return 'FrameStats(calls={}, cells={}, bytes={})'.format(self.calls, self.cells,
+                                                                  self.bytes)
+
+
+class MirroredScreen(Screen):
+    """A screen that keeps a copy of the characters and attributes it shows, so that they can be
+       read back with inch() and contents()."""
+    def _forget(self):
+        """Starts the copy over as a blank screen of the current size."""
+        self._chars = [[' '] * self.width for _ in range(self.height)]
+        self._attrs = [[0] * self.width for _ in range(self.height)]
+
+    def _put(self, row, col, string, attr):
+        """Copies a string written at the given position, wrapping like curses does."""
+        if string.isascii() and col + len(string) <= self.width:
+            self._chars[row][col:col + len(string)] = string
+            self._attrs[row][col:col + len(string)] = [attr] * len(string)
+            return
+        for character in string:
+            columns = char_width(character)
+            if not columns:
+                # combining marks join the character before them
+                if col:
+                    self._chars[row][col - 1] += character
+                continue
+            if row >= self.height:
+                raise curses.error('addstr() returned ERR')
+            self._chars[row][col] = character
+            self._attrs[row][col] = attr
+            if columns == 2 and col + 1 < self.width:
+                # the right half of a wide character shows nothing of its own
+                self._chars[row][col + 1] = ''
+                self._attrs[row][col + 1] = attr
+            col += columns
+            if col >= self.width:
+                row, col = row + 1, 0
+
+    def inch(self, row, col):
+        return ord(self._chars[row][col][:1] or ' ') | self._attrs[row][col]
+
+    def attr_at(self, row, col):
+        """Returns the attributes the character at the given position was written with."""
+        return self._attrs[row][col]
+
+    def contents(self):
+        return [''.join(row) for row in self._chars]
+
+
+class VirtualScreen(MirroredScreen):
+    """An in-memory terminal of a fixed size. It keeps the characters and attributes a real terminal
+       would show, records every write it receives, and closes a FrameStats record each time it is
+       updated, so output can be inspected and measured without a TTY."""
+    color_pairs = 256
+
+    def __init__(self, height=24, width=80, record=True):
+        self.height = height
+        self.width = width
+        self.record = record
+        self.writes = []
+        self.frames = []
+        self.frame = FrameStats()
+        self.keys = deque()
+        self.pairs = {}
+        self.clear()
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def resize(self, height, width):
+        """Changes the size of the terminal, as if its window had been resized. The contents are
+           cleared, much like a real terminal after a resize."""
+        self.height, self.width = height, width
+        self.clear()
+
+    def clear(self):
+        self._forget()
+
+    def addstr(self, row, col, string, attr=0):
+        # like curses, writing wraps onto the next line and fails past the end of the screen
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise curses.error('addstr() returned ERR')
+        self.frame.calls += 1
+        self.frame.cells += string_width(string)
+        self.frame.bytes += len(string.encode('utf-8'))
+        if self.record:
+            self.writes.append((row, col, string, attr))
+        self._put(row, col, string, attr)
+
+    def init_pair(self, pair, foreground, background):
+        self.pairs[pair] = (foreground, background)
+
+    def color_pair(self, pair):
+        return pair << 8
+
+    def pair_at(self, row, col):
+        """Returns the (foreground, background) colors of the given position, or None if the
+           character was written without a color pair."""
+        pair = (self._attrs[row][col] >> 8) & 0xff
+        return self.pairs.get(pair) if pair else None
+
+    def getch(self):
+        return self.keys.popleft() if self.keys else -1
+
+    def doupdate(self):
+        self.frames.append(self.frame)
+        self.frame = FrameStats()
+
+    def __str__(self):
+        return '\n'.join(self.contents())
+
+
+class AnsiScreen(MirroredScreen):
+    """Draws by writing ANSI/VT escape sequences straight to a file descriptor, without curses.
+       Writes are collected in memory and a whole frame goes out with a single os.write() on
+       doupdate(), and cursor moves and SGR sequences are only emitted when the cursor or the
+       attributes actually change. What was written is mirrored, so contents() reads it back. The descriptor can be a terminal, or a pipe or file to stream
+       or record the output. Key presses are not read; getch() always returns -1."""
+    color_pairs = 256
+    # SGR parameter of each curses attribute
+    ATTRIBUTES = ((curses.A_BOLD, '1'), (curses.A_DIM, '2'), (curses.A_UNDERLINE, '4'),
+                  (curses.A_BLINK, '5'), (curses.A_REVERSE, '7'))
+
+    def __init__(self, fd=None, height=None, width=None, alternate=True):
+        self.fd = sys.stdout.fileno() if fd is None else fd
+        self.alternate = alternate
+        self.pairs = {}
+        self.writes = 0
+        self._sgr = {}
+        self._out = []
+        self._cursor = None
+        self._attr = None
+        self.resize(height, width)
+
+    def resize(self, height=None, width=None):
+        """Sets the size of the screen, asking the terminal for whatever is not given. Falls back
+           to 24 by 80 if the descriptor is not a terminal."""
+        if height is None or width is None:
+            try:
+                size = os.get_terminal_size(self.fd)
+                columns, lines = size.columns, size.lines
+            except OSError:
+                columns, lines = 80, 24
+            height = lines if height is None else height
+            width = columns if width is None else width
+        self.height, self.width = height, width
+        self._forget()
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def begin(self):
+        if self.alternate:
+            self._out.append('\x1b[?1049h')
+        self._out.append('\x1b[?25l')
+
+    def end(self):
+        self._out.append('\x1b[0m\x1b[?25h')
+        if self.alternate:
+            self._out.append('\x1b[?1049l')
+        self.doupdate()
+
+    def init_pair(self, pair, foreground, background):
+        self.pairs[pair] = (foreground, background)
+        # attributes already translated with this pair are stale now
+        self._sgr.clear()
+        self._attr = None
+
+    def color_pair(self, pair):
+        return pair << 8
+
+    @staticmethod
+    def _color(color, base):
+        if color == NO_COLOR:
+            return str(base + 9)
+        if color < 8:
+            return str(base + color)
+        if color < 16:
+            return str(base + 60 + color - 8)
+        return '{};5;{}'.format(base + 8, color)
+
+    def sgr(self, attr):
+        """Returns the escape sequence selecting the given curses attributes, color pair
+           included."""
+        sequence = self._sgr.get(attr)
+        if sequence is None:
+            params = ['0'] + [param for flag, param in self.ATTRIBUTES if attr & flag]
+            pair = self.pairs.get((attr & curses.A_COLOR) >> 8)
+            if pair is not None:
+                params += [self._color(pair[0], 30), self._color(pair[1], 40)]
+            sequence = self._sgr[attr] = '\x1b[' + ';'.join(params) + 'm'
+        return sequence
+
+    def addstr(self, row, col, string, attr=0):
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise curses.error('addstr() returned ERR')
+        if self._cursor != (row, col):
+            self._out.append('\x1b[{};{}H'.format(row + 1, col + 1))
+        if self._attr != attr:
+            self._out.append(self.sgr(attr))
+            self._attr = attr
+        self._put(row, col, string, attr)
+        self._out.append(string)
+        self._cursor = (row, col + string_width(string))
+
+    def clear(self):
+        self._forget()
+        self._out.append('\x1b[0m\x1b[2J')
+        self._cursor = self._attr = None
+
+    def doupdate(self):
+        if not self._out:
+            return
+        data = ''.join(self._out).encode('utf-8')
+        self._out = []
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+        self.writes += 1
@@ -0,0 +1,55 @@
+"""
+The colors module maps the foreground and background colors of cells onto the limited number of
+color pairs a terminal provides.
+"""
+import curses
+from collections import OrderedDict
+
+from .utils import CacheStats
+from .backends import Screen
+
+# Curses packs the pair number into 8 bits of an attribute
+MAX_PAIRS = 255
+
+
+class ColorPairs(object):
+    """Hands out color pair attributes for (foreground, background) combinations, initialising a
+       pair the first time a combination is seen. Once every pair is taken, the least recently used
+       one is re-initialised for the new combination. Note that a terminal recolors everything
+       still on screen in a pair when it is redefined, so the limit should comfortably exceed the
+       number of combinations visible at once."""
+    def __init__(self, screen=None, max_pairs=None):
+        if isinstance(screen, Screen):
+            self._init_pair, self._color_pair = screen.init_pair, screen.color_pair
+            available = screen.color_pairs
+        else:
+            self._init_pair, self._color_pair = curses.init_pair, curses.color_pair
+            available = getattr(curses, 'COLOR_PAIRS', 0)
+        # pair 0 is fixed to the terminal's default colors
+        self.max_pairs = min(MAX_PAIRS, available - 1) if max_pairs is None else max_pairs
+        self.stats = CacheStats()
+        self._pairs = OrderedDict()
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def attr(self, foreground, background):
+        """Returns the attribute selecting a color pair for the given colors, NO_COLOR being the
+           terminal default. Returns 0 if the terminal has no color pairs to offer."""
+        if self.max_pairs <= 0:
+            return 0
+        key = (foreground, background)
+        pair = self._pairs.get(key)
+        if pair is not None:
+            self.stats.hits += 1
+            self._pairs.move_to_end(key)
+            return self._color_pair(pair)
+        self.stats.misses += 1
+        if len(self._pairs) < self.max_pairs:
+            pair = len(self._pairs) + 1
+        else:
+            _, pair = self._pairs.popitem(last=False)
+        self._init_pair(pair, foreground, background)
+        self._pairs[key] = pair
+        return self._color_pair(pair)
+
@@ -2,79 +2,48 @@
 The core module contains the key base-level features of terminological, such as the terminal drawing
 functionality and other important functions.
 """
+import os
+import sys
+import time
 import curses
+import signal
+import asyncio
+from collections import deque
+from contextlib import contextmanager
 
 # Local module imports
-from .utils import split, INF
-from .utils import matrix_slice, matrix_to_string, compute_sizes
+from .utils import split, clip, INF
+from .utils import matrix_slice, matrix_to_string, compute_sizes, CacheStats
+from .grid import Grid, Cell # pylint: disable=W0611
 from .errors import UnknownOutlineTypeError
+from .scheduler import RenderScheduler, RenderThread
+from .backends import Screen
+from .stats import RenderStats, LAYOUT, CONTENT, OUTPUT
+from .colors import ColorPairs
 
 # Global screen pointer
 SCREEN = None
+# Color pair allocator for the current screen
+COLOR_PAIRS = None
+# Hit/miss counters shared by the layout caches of every box
+LAYOUT_CACHE = CacheStats()
 
 
 def clear_screen():
     """Sets the SCREEN global to None to clear it."""
-    global SCREEN # pylint: disable=W0603
-    SCREEN = None
+    set_screen(None)
 
 
-class Cell(object):
-    """Represents a single cell on the screen"""
-    def __init__(self, character=' ', fg=None, bg=None):
-        self._character = character
-        self._fg = fg
-        self._bg = bg
-        self._updated = True
-
-    @property
-    def character(self):
-        """Property, returns the characcter associated with the cell."""
-        return self._character
-
-    @character.setter
-    def character(self, value):
-        self._character = value
-
-    @property
-    def foreground(self):
-        """Property, returns foreground color value."""
-        return self._fg
-
-    @foreground.setter
-    def foreground(self, value):
-        self._fg = value
-
-    @property
-    def background(self):
-        return self._bg
-
-    @background.setter
-    def background(self, value):
-        self._bg = value
-
-    def set(self, character, foreground=None, background=None):
-        if self.character != character:
-            self.character = character
-            self._updated = True
-        if foreground:
-            self.foreground = foreground
-            self._updated = True
-        if background:
-            self.background = background
-            self._updated = True
-        return self._updated
-
-    def draw(self, row, col):
-        if self._updated:
-            if SCREEN:
-                # display the character in the terminal
-                SCREEN.addstr(row, col, self._character)
-            self._updated = False
+def set_screen(screen):
+    """Sets the SCREEN global to draw on, either a curses window or a backends.Screen, along with a
+       fresh color pair allocator for it."""
+    global SCREEN, COLOR_PAIRS # pylint: disable=W0603
+    SCREEN = screen
+    COLOR_PAIRS = ColorPairs(screen) if screen is not None else None
 
 
 def gen_matrix(num_rows, num_cols):
-    return [[Cell() for c in range(num_cols)] for r in range(num_rows)]
+    return Grid(num_rows, num_cols)
 
 
 def string_to_matrix(string):
@@ -83,35 +52,12 @@ def string_to_matrix(string):
     num_cols = len(string[0])
     matrix = gen_matrix(num_rows, num_cols)
     for row_idx, row in enumerate(matrix):
-        for col_idx, cell in enumerate(row):
-            cell.set(string[row_idx][col_idx])
+        row.write(string[row_idx])
     return matrix
 
 
 def resize_matrix(matrix, height, width):
-    # Note that most terminals are much wider than they are tall
-    # therefore it is more efficient to do height adjustments first
-    current_height = len(matrix)
-    current_width = 0 if not matrix else len(matrix[0])
-    height_d = height - current_height
-    width_d = width - current_width
-    if height_d > 0:
-        # add on from the bottom
-        [matrix.append([Cell() for _ in range(current_width)])
-         for _ in range(height_d)]
-    elif height_d < 0:
-        # shrink from the bottom
-        [matrix.pop() for _ in range(0-height_d)]
-    current_height = height
-
-    if width_d > 0:
-        # add on from the side
-        [[row.append(Cell()) for _ in range(width_d)]
-         for row in matrix]
-    elif width_d < 0:
-        # shrink from the side
-        [[row.pop() for _ in range(0-width_d)] for row in matrix]
-    current_width = width
+    matrix.resize(height, width)
 
 
 class OutlineType(object):
@@ -127,6 +73,11 @@ class OutlineType(object):
 class Box(object):
     """The key object in terminological, the box handles managing all of the cells inside of it. All
        widgets are typically in some way building upon boxes."""
+    deferred_refresh = False
+    scheduler = None
+    # rows the box always draws in, for boxes of a fixed height, 0 for all others
+    natural_height = 0
+
     def __init__(self, height=0, width=0, parent_box=None, matrix=None,
                  weight=1, max_size=INF, min_size=0, outline=OutlineType.No):
         self.matrix = None
@@ -139,6 +90,8 @@ class Box(object):
         if not self.matrix:
             self.matrix = gen_matrix(height, width)
         self.children = []
+        self._layout_key = None
+        self._layout = None
 
     def _draw_outline_corners(self):
         if self.matrix and self.matrix[0]:
@@ -149,13 +102,13 @@ class Box(object):
 
     def _draw_outline_top_bottom(self, character='─'):
         if self.matrix and self.matrix[0]:
-            [c.set(character) for c in self.matrix[0][1:-1]]
-            [c.set(character) for c in self.matrix[self.height-1][1:-1]]
+            self.matrix[0][1:-1].fill(character)
+            self.matrix[self.height-1][1:-1].fill(character)
 
     def _draw_outline_right_left(self, character='│'):
         if self.matrix and self.matrix[0]:
-            [r[0].set(character) for r in self.matrix[1:-1]]
-            [r[self.width-1].set(character) for r in self.matrix[1:-1]]
+            self.matrix[1:-1].column(0).fill(character)
+            self.matrix[1:-1].column(self.width-1).fill(character)
 
     def _outline_offsets(self):
         if self.outline == OutlineType.No:
@@ -188,9 +141,66 @@ class Box(object):
     def width(self):
         return self.num_cols
 
+    @property
+    def root(self):
+        """Property, returns the base box of the tree this box belongs to."""
+        box = self
+        while box.parent_box is not None:
+            box = box.parent_box
+        return box
+
+    def invalidate(self, draw=None):
+        """Signals that the contents of this box changed. If the base box has a render scheduler,
+           the redraw is left to it, otherwise the box is redrawn right away, by calling draw if
+           given (to redraw only the part that changed) or draw() otherwise. A base box is flushed
+           to the screen either way."""
+        if not self.matrix:
+            # boxes without a single cell on screen, such as scrolled out children, have nothing to
+            # redraw until they are given a matrix again
+            return
+        scheduler = self.root.scheduler
+        if scheduler is None:
+            stats = self.matrix.grid.stats
+            if stats is not None:
+                stats.enter(CONTENT)
+            (draw or self.draw)()
+            if stats is not None:
+                stats.exit()
+            if draw is not None and self.parent_box is None:
+                # draw() flushes the base box itself, a partial draw does not
+                self.flush()
+        else:
+            scheduler.request(self)
+
+    @property
+    def visible_children(self):
+        """Property, returns the children that currently have a part of this box to draw in."""
+        return self.children
+
     def set_matrix(self, matrix):
+        """Hands the box the region of its parent's grid that it draws into. Matrices are views, so
+           this never copies any cells."""
         self.matrix = matrix
 
+    def compute_child_sizes(self, total_size):
+        """Returns compute_sizes() for the children along the layout axis. The last result is
+           remembered and reused for as long as neither the available size nor any child's
+           weight, min_size or max_size changes."""
+        constraints = tuple((c.weight, c.min_size, c.max_size) for c in self.children)
+        key = (constraints, total_size)
+        if key == self._layout_key:
+            LAYOUT_CACHE.hits += 1
+            return self._layout
+        LAYOUT_CACHE.misses += 1
+        stats = self.matrix.grid.stats
+        if stats is not None:
+            stats.enter(LAYOUT)
+        self._layout = compute_sizes([(0,) + c for c in constraints], total_size)
+        self._layout_key = key
+        if stats is not None:
+            stats.exit()
+        return self._layout
+
     def add_child(self, child):
         self.children.append(child)
         child.parent_box = self
@@ -205,10 +215,11 @@ class Box(object):
         else:
             height = new_height if new_height is not None else self.height
             width = new_width if new_width is not None else self.width
-        # if this is the base box, resize the matrix
+        # if this is the base box, resize the matrix, otherwise trim the slice we were given
         if self.parent_box is None:
             resize_matrix(self.matrix, height, width)
-        self.set_matrix(matrix_slice(self.matrix, 0, height, 0, width))
+        else:
+            self.set_matrix(matrix_slice(self.matrix, 0, height, 0, width))
 
     def draw(self):
         # draw the outline
@@ -226,13 +237,56 @@ class Box(object):
             self._draw_outline_corners()
             self._draw_outline_top_bottom()
             self._draw_outline_right_left(' ')
-        [c.draw() for c in self.children]
-        # if this is the base box, refresh
-        if self.parent_box is None and SCREEN:
-            # render each cell
-            [[cell.draw(r, c) for c, cell in enumerate(row)]
-             for r, row in enumerate(self.matrix)]
-            SCREEN.refresh()
+        # if this is the base box, draw the children and refresh
+        if self.parent_box is None:
+            stats = self.matrix.grid.stats
+            if stats is not None:
+                stats.enter(CONTENT)
+            [c.draw() for c in self.visible_children]
+            if stats is not None:
+                stats.exit()
+            self.flush()
+        else:
+            [c.draw() for c in self.visible_children]
+
+    def flush(self):
+        """Writes the damaged regions of the base box's grid to the screen. With deferred_refresh
+           set, the screen is only marked for update and update_screen() must be called to push
+           it to the terminal."""
+        if SCREEN:
+            stats = self.matrix.grid.stats
+            if stats is not None:
+                stats.enter(OUTPUT)
+            calls, cells = self.matrix.draw(SCREEN, COLOR_PAIRS)
+            if self.deferred_refresh:
+                SCREEN.noutrefresh()
+            else:
+                SCREEN.refresh()
+            if stats is not None:
+                stats.exit()
+                stats.frame.calls += calls + 1
+                stats.frame.cells_flushed += cells
+                stats.end_frame()
+
+    def resync(self):
+        """Forgets what the screen shows, so that the next flush writes every cell of the base
+           box's grid again. Call after the terminal was cleared or reset."""
+        self.matrix.grid.resync()
+
+    @property
+    def stats(self):
+        """Property, the RenderStats collected for this box's grid, or None when disabled."""
+        return self.matrix.grid.stats
+
+    def enable_stats(self, callback=None, history=120):
+        """Starts instrumenting the frames of this base box and its children. Returns the new
+           RenderStats, which also hands each FrameRecord to callback if one is given."""
+        self.matrix.grid.stats = RenderStats(callback, history)
+        return self.matrix.grid.stats
+
+    def disable_stats(self):
+        """Stops instrumenting the frames of this base box."""
+        self.matrix.grid.stats = None
 
     def __str__(self):
         return matrix_to_string(self.matrix)
@@ -252,9 +306,8 @@ class Filler(Box):
 
     def draw(self):
         Box.draw(self)
-        for row_idx in range(self.num_rows):
-            for col_idx in range(self.num_cols):
-                self.matrix[row_idx][col_idx].set(self.character)
+        for row in self.matrix:
+            row.fill(self.character)
 
 
 class VerticalBox(Box):
@@ -263,8 +316,7 @@ class VerticalBox(Box):
         # control for outlines
         height, width, h_offset, v_offset = self._outline_offsets()
         # compute the new sizes for the children elements
-        heights = compute_sizes([(0, c.weight, c.min_size, c.max_size)
-                                 for c in self.children], height)
+        heights = self.compute_child_sizes(height)
         sizes = [(int(h[0]), width) for h in heights]
         # update their matrices
         for i, child in enumerate(self.children):
@@ -283,8 +335,7 @@ class HorizontalBox(Box):
             # control for outlines
             height, width, h_offset, v_offset = self._outline_offsets()
             # compute the new sizes for the children elements
-            widths = compute_sizes([(0, c.weight, c.min_size, c.max_size)
-                                    for c in self.children], width)
+            widths = self.compute_child_sizes(width)
             sizes = [(height, int(w[0])) for w in widths]
             # update their matrices
             for i, child in enumerate(self.children):
@@ -296,24 +347,277 @@ class HorizontalBox(Box):
         self.draw()
 
 
-def start(mainframe: Box, run_callback=None):
-    # make the cursor invisible
+class ScrollBox(Box):
+    """A vertical list of children that can hold far more of them than fit. Every child is given
+       its natural_height or min_size rows, whichever is more, or a single row if it has
+       neither, and only the children that fit in
+       the box from the top one on are resized and drawn; the others are left without a matrix
+       until they are scrolled into view. Scrolling moves by whole children."""
+    def __init__(self, height=0, width=0, parent_box=None, matrix=None,
+                 weight=1, max_size=INF, min_size=0, outline=OutlineType.No):
+        Box.__init__(self, height, width, parent_box, matrix, weight,
+                     max_size, min_size, outline=outline)
+        self.top = 0
+        self._visible = []
+
+    @staticmethod
+    def child_height(child):
+        return max(child.natural_height, child.min_size, 1)
+
+    @property
+    def visible_children(self):
+        return self._visible
+
+    def _last_top(self, height):
+        """Returns the index of the top child when scrolled all the way down."""
+        idx, used = len(self.children), 0
+        while idx > 0 and used + self.child_height(self.children[idx - 1]) <= height:
+            idx -= 1
+            used += self.child_height(self.children[idx])
+        return min(idx, len(self.children) - 1) if self.children else 0
+
+    def scroll_to(self, index):
+        """Scrolls so that the child at the given index is at the top, or as close to it as the
+           last page allows, and redraws."""
+        self.top = index
+        self.resize(self.height, self.width)
+
+    def scroll_by(self, count):
+        """Scrolls the given number of children down (or up, if negative)."""
+        self.scroll_to(self.top + count)
+
+    def resize(self, new_height=None, new_width=None):
+        Box.resize(self, new_height, new_width)
+        height, width, h_offset, v_offset = self._outline_offsets()
+        self.top = max(0, min(self.top, self._last_top(height)))
+        visible = []
+        used = 0
+        for idx in range(self.top, len(self.children)):
+            child_height = self.child_height(self.children[idx])
+            if used + child_height > height:
+                break
+            visible.append(self.children[idx])
+            used += child_height
+        # children that scrolled out give their cells back
+        shown = set(map(id, visible))
+        for child in self._visible:
+            if id(child) not in shown:
+                child.set_matrix(matrix_slice(self.matrix, 0, 0, 0, 0))
+        self._visible = visible
+        for child in visible:
+            child_height = self.child_height(child)
+            child.set_matrix(matrix_slice(self.matrix, v_offset, child_height, h_offset, width))
+            v_offset += child_height
+            child.resize(new_height=child_height, new_width=width)
+        self.draw()
+
+    def draw(self):
+        height, width, h_offset, v_offset = self._outline_offsets()
+        used = sum(self.child_height(child) for child in self._visible)
+        if width > 0:
+            self.matrix.view(v_offset + used, height - used, h_offset, width).fill(' ')
+        Box.draw(self)
+
+
+def use_default_colors():
+    """Lets -1 (NO_COLOR) stand for the terminal's own colors in color pairs, where supported."""
+    try:
+        curses.use_default_colors()
+    except curses.error:
+        pass
+
+
+def update_screen():
+    """Pushes every pending noutrefresh() to the terminal in one go."""
+    if isinstance(SCREEN, Screen):
+        SCREEN.doupdate()
+    elif SCREEN:
+        curses.doupdate()
+
+
+def start(mainframe: Box, run_callback=None, deferred_refresh=False, max_fps=None,
+          render_thread=False, screen=None):
+    """Runs the given base box in the terminal until run_callback returns. By default every widget
+       update is drawn and flushed right away. Given max_fps, updates are rendered through a
+       RenderScheduler capped at max_fps frames a second instead: an update arriving within a
+       frame of the previous one waits for mainframe.scheduler.tick(), which run_callback's loop
+       has to call, and whatever is still pending when run_callback returns is rendered then.
+       get_key() does both while waiting for input. With render_thread set, frames are rendered
+       by a background RenderThread, at max_fps or the scheduler's default rate, and updates must
+       be handed over through mainframe.scheduler.post() from any thread. Given a backends.Screen, everything is drawn on it instead and curses is never initialised: a
+       VirtualScreen to run headless, or an AnsiScreen to write escape sequences straight to the
+       terminal, or to a pipe or file."""
+    if max_fps is not None and max_fps <= 0:
+        raise ValueError('max_fps must be positive, or None for no frame rate cap')
+    mainframe.deferred_refresh = deferred_refresh
+    if max_fps is not None or render_thread:
+        mainframe.scheduler = RenderScheduler(mainframe) if max_fps is None else \
+            RenderScheduler(mainframe, max_fps)
+        mainframe.scheduler.on_resize = lambda: _forget_screen(mainframe)
+
     def wrapped_main(stdscr):
-        global SCREEN # pylint: disable=W0603
-        SCREEN = stdscr
-        curses.curs_set(0)
+        if not isinstance(stdscr, Screen):
+            # make the cursor invisible and let NO_COLOR mean the terminal's default colors
+            curses.curs_set(0)
+            use_default_colors()
+        set_screen(stdscr)
         # Clear screen
         SCREEN.clear()
+        mainframe.resync()
+        max_rows, max_cols = SCREEN.getmaxyx()
+        mainframe.resize(max_rows, max_cols-1)
+        update_screen()
+        thread = None
+        if render_thread:
+            thread = RenderThread(mainframe.scheduler)
+            thread.start()
+        try:
+            if run_callback is not None:
+                run_callback()
+        finally:
+            if thread is not None:
+                # renders whatever was still queued
+                thread.stop()
+            elif mainframe.scheduler is not None:
+                mainframe.scheduler.drain()
+                if mainframe.scheduler.pending:
+                    mainframe.scheduler.render()
+    try:
+        if screen is None:
+            curses.wrapper(wrapped_main)
+        else:
+            screen.begin()
+            try:
+                wrapped_main(screen)
+            finally:
+                screen.end()
+    finally:
+        mainframe.scheduler = None
+
+
+def _forget_screen(mainframe):
+    """Clears the screen after the terminal was resized and makes the next frame draw it all."""
+    SCREEN.clear()
+    mainframe.resync()
+
+
+def get_key(mainframe: Box, timeout=None):
+    """Waits for a key press for at most timeout seconds (or for as long as it takes if None) and
+       returns it, or -1 if none came. Meant to be the blocking call of the loop in start()'s
+       run_callback: while it waits, frames the base box's render scheduler held back are rendered
+       as they fall due, and KEY_RESIZE lays the base box out again at the new terminal size, at
+       most once a frame with a scheduler, instead of being returned. Screens other than curses
+       are only polled, so with nothing to wait for it returns -1 at once."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        scheduler = mainframe.scheduler
+        wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if scheduler is not None and scheduler.thread is None:
+            scheduler.tick()
+            if scheduler.pending:
+                due = scheduler.next_frame_in()
+                wait = due if wait is None else min(wait, due)
+        if isinstance(SCREEN, Screen):
+            key = SCREEN.getch()
+            if key == -1 and wait is None:
+                return key
+            if key == -1:
+                time.sleep(wait)
+        else:
+            SCREEN.timeout(-1 if wait is None else int(wait * 1000 + 0.5))
+            key = SCREEN.getch()
+        if key == curses.KEY_RESIZE:
+            if scheduler is None:
+                _forget_screen(mainframe)
+                mainframe.resize(None, None)
+            elif scheduler.thread is None:
+                scheduler.request_resize()
+            else:
+                scheduler.post(scheduler.request_resize)
+        elif key != -1 or deadline is not None and time.monotonic() >= deadline:
+            return key
+
+
+async def async_start(mainframe: Box, coro, max_fps=30, on_key=None):
+    """The asyncio counterpart of start(): sets up the terminal, awaits the given coroutine and
+       tears the terminal down again once it finishes. Nothing blocks the event loop: key presses
+       are read through loop.add_reader() and handed to on_key, SIGWINCH is caught through
+       loop.add_signal_handler() and re-lays out the base box at most once a frame, and frames
+       are scheduled with loop.call_later()."""
+    loop = asyncio.get_running_loop()
+    scheduler = RenderScheduler(mainframe, max_fps)
+    frame_handle = None
+
+    def render_frame():
+        nonlocal frame_handle
+        frame_handle = None
+        scheduler.tick()
+        schedule_frame()
+
+    def schedule_frame():
+        nonlocal frame_handle
+        if frame_handle is None and scheduler.pending:
+            frame_handle = loop.call_later(scheduler.next_frame_in(), render_frame)
+
+    def read_keys():
+        key = SCREEN.getch()
+        while key != -1:
+            if on_key is not None and key != curses.KEY_RESIZE:
+                on_key(key)
+            key = SCREEN.getch()
+
+    def resize_terminal():
+        width, height = os.get_terminal_size(sys.__stdout__.fileno())
+        curses.resizeterm(height, width)
+        SCREEN.clear()
+        mainframe.resync()
+
+    stdscr = curses.initscr()
+    try:
+        curses.noecho()
+        curses.cbreak()
+        stdscr.keypad(1)
+        stdscr.nodelay(True)
+        try:
+            curses.start_color()
+        except curses.error:
+            pass
+        use_default_colors()
+        set_screen(stdscr)
+        curses.curs_set(0)
+        SCREEN.clear()
+        mainframe.resync()
         max_rows, max_cols = SCREEN.getmaxyx()
         mainframe.resize(max_rows, max_cols-1)
-        if run_callback is not None:
-            run_callback()
-    curses.wrapper(wrapped_main)
+        mainframe.scheduler = scheduler
+        scheduler.on_pending = schedule_frame
+        scheduler.on_resize = resize_terminal
+        loop.add_reader(sys.stdin.fileno(), read_keys)
+        loop.add_signal_handler(signal.SIGWINCH, scheduler.request_resize)
+        try:
+            return await coro
+        finally:
+            loop.remove_reader(sys.stdin.fileno())
+            loop.remove_signal_handler(signal.SIGWINCH)
+            if frame_handle is not None:
+                frame_handle.cancel()
+            if scheduler.pending:
+                scheduler.render()
+    finally:
+        # never leave the coroutine un-awaited if the terminal could not be set up
+        coro.close()
+        mainframe.scheduler = None
+        stdscr.keypad(0)
+        curses.echo()
+        curses.nocbreak()
+        curses.endwin()
 
 
 def screen_to_string():
     if not SCREEN:
         return ''
+    if isinstance(SCREEN, Screen):
+        return '\n'.join(row[:-1] for row in SCREEN.contents())
     result = []
     height, width = SCREEN.getmaxyx()
     for row_idx in range(height):
@@ -331,29 +635,59 @@ class MsgLog(Box):
         Box.__init__(self, height, width, parent_box, matrix, weight,
                      max_size, min_size, outline=outline)
         self.history_max = history_max
-        self.message_history = []
+        self.message_history = deque(maxlen=history_max)
+        # [width, lines] for each message, rewrapped lazily whenever the width changes
+        self._wrapped = deque(maxlen=history_max)
+        self._batch_depth = 0
 
     def add_message(self, msg):
-        if len(self.message_history) >= self.history_max:
-            self.message_history.pop(0)
         self.message_history.append(msg)
-        self.draw()
+        self._wrapped.append([None, None])
+        if not self._batch_depth:
+            self.invalidate()
+
+    def add_messages(self, msgs):
+        """Appends every message in the given iterable and then redraws once."""
+        msgs = list(msgs)
+        with self.batch():
+            self.message_history.extend(msgs)
+            self._wrapped.extend([None, None] for _ in msgs)
+
+    @contextmanager
+    def batch(self):
+        """Context manager that holds back the redraw of add_message() calls made inside of it
+           until the outermost batch exits."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.invalidate()
+
+    def _visible_lines(self, height, width):
+        """Returns the last height wrapped lines of the history, oldest first. Only the messages
+           that end up on screen are looked at, and each is only split again if the width changed
+           since it was last wrapped."""
+        chunks = []
+        count = 0
+        for msg, wrapped in zip(reversed(self.message_history), reversed(self._wrapped)):
+            if count >= height:
+                break
+            if wrapped[0] != width:
+                wrapped[0], wrapped[1] = width, split(msg, width)
+            chunks.append(wrapped[1])
+            count += len(wrapped[1])
+        display = [line for chunk in reversed(chunks) for line in chunk]
+        return display[max(0, count - height):]
 
     def _print_line(self, h_offset, v_offset, line, width):
-        row = self.matrix[v_offset]
-        [row[i+h_offset].set(ch) for i, ch in enumerate(line) if i < width]
-        [row[i].set(' ') for i in range(len(line) + h_offset, width + h_offset)]
+        self.matrix[v_offset].write(clip(line, width), h_offset)
 
     def draw(self):
         Box.draw(self)
         height, width, h_offset, v_offset = self._outline_offsets()
-        display = []
-        for msg in reversed(self.message_history):
-            display[0:0] = split(msg, width)
-            for _ in range(len(display) - height):
-                display.pop(0)
-            if len(display) == height:
-                break
+        display = self._visible_lines(height, width)
         [display.append(' ' * width) for _ in range(height - len(display))]
         for i, line in enumerate(display):
             self._print_line(h_offset, i+v_offset, line, width)
@@ -0,0 +1,661 @@
+"""
+The grid module contains the compact storage that backs every box in terminological. Instead of one
+Python object per screen position, a grid keeps characters, colors, attributes and dirty flags in
+parallel flat buffers and hands out lightweight row, column and cell views on demand.
+
+Cells are terminal columns rather than characters. A wide character takes up its own cell and a
+continuation cell to its right, and combining marks are kept, along with the character they
+attach to, in a side table of clusters, so only text that has them pays for them.
+"""
+import sys
+from array import array
+
+from .stats import DIFF
+from .utils import char_width
+
+# Sentinel stored in the color buffers when a cell has no explicit color
+NO_COLOR = -1
+BLANK = ord(' ')
+# Stored in the front buffer for cells whose contents on screen are unknown, never a code point
+UNKNOWN = 0xffffffff
+# Stored in the cell to the right of a wide character, which it covers on screen
+CONTINUATION = 0x110000
+# Terminals act on control characters rather than show them, so they are stored as blanks
+CONTROLS = dict.fromkeys(list(range(0x20)) + list(range(0x7f, 0xa0)), ' ')
+# Code points are stored as native unsigned ints, which decode directly as UTF-32
+CODEC = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+
+
+def printable(string):
+    """Returns the string with every control character replaced by a blank."""
+    return string if string.isprintable() else string.translate(CONTROLS)
+
+
+def encode(string, limit):
+    """Turns a string into the code points of the cells it covers, at most limit of them, and the
+       clusters of characters with combining marks, as a {cell: cluster} dict. A wide character
+       that does not fit in the last cell is replaced by a blank."""
+    codes, clusters = [], {}
+    lead = None
+    for char in string:
+        columns = char_width(char)
+        if not columns:
+            if lead is not None:
+                clusters[lead] = clusters.get(lead, chr(codes[lead])) + char
+            continue
+        if len(codes) + columns > limit:
+            if len(codes) < limit:
+                codes.append(BLANK)
+            break
+        lead = len(codes)
+        codes.append(ord(char))
+        if columns == 2:
+            codes.append(CONTINUATION)
+    return array('I', codes), clusters
+
+
+def pack(code, foreground, background, attributes):
+    """Packs everything that determines how a cell looks into a single integer, so two states of a
+       cell can be compared at once. Colors are kept as their 16 bit two's complement."""
+    return code | (foreground & 0xffff) << 21 | (background & 0xffff) << 37 | attributes << 53
+
+
+class Cell(object):
+    """A handle on a single position of a grid. Cells own no state of their own, every read and
+       write goes straight through to the grid buffers. stop is the buffer index a wide character
+       set in the cell has to end before, the end of the grid's row if None."""
+    __slots__ = ('_grid', '_index', '_stop')
+
+    def __init__(self, grid, index, stop=None):
+        self._grid = grid
+        self._index = index
+        self._stop = stop
+
+    @property
+    def character(self):
+        """Property, returns the character associated with the cell, along with any combining
+           marks, or '' if the cell is covered by a wide character to its left."""
+        code = self._grid.chars[self._index]
+        if code == CONTINUATION:
+            return ''
+        return self._grid.clusters.get(self._index) or chr(code)
+
+    @character.setter
+    def character(self, value):
+        value = printable(value)
+        self._grid.chars[self._index] = ord(value[0])
+        if len(value) > 1:
+            self._grid.clusters[self._index] = value
+        else:
+            self._grid.clusters.pop(self._index, None)
+
+    @property
+    def foreground(self):
+        """Property, returns foreground color value."""
+        value = self._grid.fg[self._index]
+        return None if value == NO_COLOR else value
+
+    @foreground.setter
+    def foreground(self, value):
+        self._grid.fg[self._index] = NO_COLOR if value is None else value
+
+    @property
+    def background(self):
+        """Property, returns background color value."""
+        value = self._grid.bg[self._index]
+        return None if value == NO_COLOR else value
+
+    @background.setter
+    def background(self, value):
+        self._grid.bg[self._index] = NO_COLOR if value is None else value
+
+    @property
+    def attributes(self):
+        """Property, returns the curses attributes (A_BOLD, A_UNDERLINE, ...) of the cell."""
+        return self._grid.attrs[self._index]
+
+    @attributes.setter
+    def attributes(self, value):
+        self._grid.attrs[self._index] = value
+
+    @property
+    def updated(self):
+        """Property, True if the cell has changed since it was last drawn."""
+        return bool(self._grid.dirty[self._index])
+
+    def set(self, character, foreground=None, background=None, attributes=None, force=False):
+        """Sets the character of the cell, and its colors and attributes unless they are None, which
+           leaves them as they are. The cell is only marked for drawing if its content actually
+           changes, or if force is True, which also has it written even if the screen already
+           shows the same. A wide character also covers the cell to its right, and becomes a blank
+           in the last cell of the row or view the cell was taken from. Returns True if the cell
+           needs to be drawn."""
+        grid, index = self._grid, self._index
+        stats = grid.stats
+        if stats is not None:
+            stats.enter(DIFF)
+            stats.frame.cells_touched += 1
+        fg, bg, attrs = grid.fg[index], grid.bg[index], grid.attrs[index]
+        current = pack(grid.chars[index], fg, bg, attrs)
+        character = printable(character)
+        code = ord(character[0])
+        wide = grid.is_wide(code)
+        stop = self._stop
+        if stop is None:
+            stop = index - index % grid.stride + grid.num_cols
+        if wide and index + 2 > stop:
+            code, character, wide = BLANK, ' ', False
+        cluster = character if len(character) > 1 else None
+        if foreground is not None:
+            fg = foreground
+        if background is not None:
+            bg = background
+        if attributes is not None:
+            attrs = attributes
+        if pack(code, fg, bg, attrs) != current or grid.clusters.get(index) != cluster or \
+           wide and grid.chars[index + 1] != CONTINUATION:
+            grid.chars[index] = code
+            grid.fg[index] = fg
+            grid.bg[index] = bg
+            grid.attrs[index] = attrs
+            if grid.clusters.get(index) != cluster:
+                grid.set_cluster(index, cluster)
+            grid.mark(index)
+            if wide:
+                grid.chars[index + 1] = CONTINUATION
+                grid.fg[index + 1], grid.bg[index + 1], grid.attrs[index + 1] = fg, bg, attrs
+                if index + 1 in grid.clusters:
+                    grid.set_cluster(index + 1, None)
+                grid.mark(index + 1)
+            grid.repair_wide(index, index + 1 + wide)
+        elif force:
+            grid.front_chars[index] = UNKNOWN
+            grid.mark(index)
+        if stats is not None:
+            stats.exit()
+        return bool(grid.dirty[index])
+
+
+class Line(object):
+    """A one dimensional window onto a grid: a row when the stride is 1, or a column when the stride
+       is the row stride of the grid. Creating or slicing a line never copies the underlying buffers."""
+    __slots__ = ('grid', 'start', 'length', 'stride')
+
+    def __init__(self, grid, start, length, stride=1):
+        self.grid = grid
+        self.start = start
+        self.length = length
+        self.stride = stride
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return Line(self.grid, self.start + start * self.stride,
+                        max(0, stop - start), self.stride)
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError('line index out of range')
+        return Cell(self.grid, self.start + key * self.stride, self._cell_stop(key))
+
+    def __iter__(self):
+        return (Cell(self.grid, self.start + i * self.stride, self._cell_stop(i))
+                for i in range(self.length))
+
+    def _cell_stop(self, key):
+        # a wide character has to fit in a row, and has no room in a column
+        if self.stride == 1:
+            return self.start + self.length
+        return self.start + key * self.stride + 1
+
+    def __str__(self):
+        span = self.span
+        return self.grid.text(span.start, span.stop, span.step or 1)
+
+    @property
+    def span(self):
+        """Property, the slice of the grid buffers covered by this line."""
+        if not self.length:
+            return slice(0, 0)
+        return slice(self.start, self.start + (self.length - 1) * self.stride + 1, self.stride)
+
+    def fill(self, character, foreground=None, background=None, attributes=None, force=False):
+        """Sets every cell of the line to the given character, and colors and attributes if given,
+           using one buffer assignment per buffer. With force, the line is written to the screen on
+           the next draw even if nothing changed. A wide character fills a row two cells at a time,
+           leaving a blank in an odd last cell, and is replaced by a blank in a column, which has
+           no room for its right halves. Returns True if anything changed."""
+        if not self.length:
+            return False
+        grid = self.grid
+        stats = grid.stats
+        if stats is not None:
+            stats.enter(DIFF)
+            stats.frame.cells_touched += self.length
+        span = self.span
+        changed = False
+        character = printable(character)
+        code, step = ord(character[0]), 1
+        chars = array('I', [code]) * self.length
+        if grid.is_wide(code):
+            if self.stride == 1:
+                step = 2
+                chars = array('I', [code, CONTINUATION]) * (self.length // 2)
+                if self.length % 2:
+                    chars.append(BLANK)
+            else:
+                character = ' '
+                chars = array('I', [BLANK]) * self.length
+        clusters = None
+        if len(character) > 1:
+            clusters = dict.fromkeys(range(0, self.length - step + 1, step), character)
+        for buf, value in ((grid.chars, chars), (grid.fg, foreground),
+                           (grid.bg, background), (grid.attrs, attributes)):
+            if value is None:
+                continue
+            filled = value if buf is grid.chars else array(buf.typecode, [value]) * self.length
+            if buf[span] != filled:
+                buf[span] = filled
+                changed = True
+        if (clusters or grid.clusters) and grid.replace_clusters(span, clusters):
+            changed = True
+        if changed and self.stride == 1:
+            grid.repair_wide(span.start, span.stop)
+        elif changed:
+            for index in range(span.start, span.stop, span.step):
+                grid.repair_wide(index, index + 1)
+        if force:
+            grid.front_chars[span] = array('I', [UNKNOWN]) * self.length
+        if changed or force:
+            grid.mark_line(self.start, self.length, self.stride)
+        if stats is not None:
+            stats.exit()
+        return changed
+
+    def write(self, string, col=0, foreground=None, background=None, attributes=None):
+        """Writes the string into the line from the given column on, cut off at the end of the line,
+           and sets colors and attributes over it if given. The string is compared with the cells
+           it covers as a whole, so rewriting identical text is a single buffer comparison, and
+           only the part from the first to the last changed cell is marked for drawing. Wide
+           characters take up two cells, which only makes sense for rows. Returns True if anything
+           changed."""
+        available = self.length - col
+        if available <= 0 or not string:
+            return False
+        string = printable(string)
+        if string.isascii():
+            codes, clusters = array('I'), None
+            codes.frombytes(string[:available].encode(CODEC, 'surrogatepass'))
+        else:
+            codes, clusters = encode(string, available)
+        length = len(codes)
+        if not length:
+            return False
+        grid = self.grid
+        stats = grid.stats
+        if stats is not None:
+            stats.enter(DIFF)
+            stats.frame.cells_touched += length
+        start = self.start + col * self.stride
+        span = slice(start, start + (length - 1) * self.stride + 1, self.stride)
+        current = grid.chars[span]
+        lo, hi = 0, length
+        if current != codes:
+            grid.chars[span] = codes
+            while current[lo] == codes[lo]:
+                lo += 1
+            while current[hi - 1] == codes[hi - 1]:
+                hi -= 1
+            if self.stride == 1:
+                grid.repair_wide(start, start + length)
+        else:
+            lo = hi
+        if (clusters or grid.clusters) and grid.replace_clusters(span, clusters):
+            lo, hi = 0, length
+        for buf, value in ((grid.fg, foreground), (grid.bg, background),
+                           (grid.attrs, attributes)):
+            if value is None:
+                continue
+            filled = array(buf.typecode, [value]) * length
+            if buf[span] != filled:
+                buf[span] = filled
+                lo, hi = 0, length
+        if clusters is not None and self.stride == 1 and CONTINUATION in codes:
+            # the right half of a wide character is drawn with the colors of its left half
+            for cell in range(1, length):
+                if codes[cell] == CONTINUATION and grid.copy_style(start + cell - 1, start + cell):
+                    lo, hi = (cell, cell + 1) if lo >= hi else (min(lo, cell), max(hi, cell + 1))
+        if lo < hi:
+            grid.mark_line(start + lo * self.stride, hi - lo, self.stride)
+        if stats is not None:
+            stats.exit()
+        return lo < hi
+
+
+class GridView(object):
+    """A rectangular window onto a grid, described by its origin and size. Indexing a view by row
+       returns a Line, so views can be used anywhere a list of rows of cells was. Slicing a view
+       returns another view onto the same grid, so writes always land in the underlying buffers."""
+    __slots__ = ('grid', 'row', 'col', 'num_rows', 'num_cols')
+
+    def __init__(self, grid, row, col, num_rows, num_cols):
+        self.grid = grid
+        self.row = row
+        self.col = col
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.num_rows)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.view(start, stop - start, 0, self.num_cols)
+        if key < 0:
+            key += self.num_rows
+        if not 0 <= key < self.num_rows:
+            raise IndexError('grid index out of range')
+        return Line(self.grid, (self.row + key) * self.grid.stride + self.col, self.num_cols)
+
+    def __iter__(self):
+        return (self[i] for i in range(self.num_rows))
+
+    def __str__(self):
+        return '\n'.join(str(row) for row in self)
+
+    def view(self, row_start, row_len, col_start, col_len):
+        """Returns a view onto a sub-rectangle of this one, clipped to its bounds the same way list
+           slicing would be. No cells are copied."""
+        row_start = min(max(row_start, 0), self.num_rows)
+        col_start = min(max(col_start, 0), self.num_cols)
+        row_len = max(0, min(row_len, self.num_rows - row_start))
+        col_len = max(0, min(col_len, self.num_cols - col_start))
+        return GridView(self.grid, self.row + row_start, self.col + col_start, row_len, col_len)
+
+    def column(self, col_idx):
+        """Returns a Line running down the given column of the view."""
+        stride = self.grid.stride
+        return Line(self.grid, self.row * stride + self.col + col_idx, self.num_rows, stride)
+
+    def fill(self, character, foreground=None, background=None, attributes=None, force=False):
+        """Sets every cell of the view to the given character, and colors and attributes if given.
+           Returns True if anything changed."""
+        return any([row.fill(character, foreground, background, attributes, force)
+                    for row in self])
+
+
+class Grid(GridView):
+    """A rectangular block of cells stored as parallel flat buffers in row-major order. A grid is
+       the view of its own full extent; every other view of it shares its buffers. The buffers
+       keep the largest size the grid has had: rows are stride cells apart and there is room for
+       capacity rows, so shrinking and growing back again never reallocates.
+
+       Grids are double buffered. The back buffers (chars, fg, bg, attrs) hold what the boxes
+       drew, and the front buffers hold what the screen is showing as of the last draw(), so only
+       cells that really differ from the screen are ever written to it."""
+    # RenderStats collecting instrumentation for this grid, if any
+    stats = None
+    # name, array typecode (None for a bytearray) and initial value of every buffer
+    BUFFERS = (('chars', 'I', BLANK), ('fg', 'h', NO_COLOR), ('bg', 'h', NO_COLOR),
+               ('attrs', 'I', 0), ('dirty', None, 1), ('front_chars', 'I', UNKNOWN),
+               ('front_fg', 'h', NO_COLOR), ('front_bg', 'h', NO_COLOR), ('front_attrs', 'I', 0))
+
+    def __init__(self, num_rows=0, num_cols=0):
+        GridView.__init__(self, self, 0, 0, num_rows, num_cols)
+        self.stride, self.capacity = num_cols, num_rows
+        for name, typecode, value in self.BUFFERS:
+            setattr(self, name, self._buffer(typecode, value, num_rows * num_cols))
+        # buffer index -> character and combining marks, for the cells that have any
+        self.clusters = {}
+        # row index -> [first, last) columns that may hold dirty cells
+        self.damage = {row_idx: [0, num_cols] for row_idx in range(num_rows)}
+
+    @staticmethod
+    def _buffer(typecode, value, size):
+        if typecode is None:
+            return bytearray([value]) * size
+        return array(typecode, [value]) * size
+
+    def fill(self, character, foreground=None, background=None, attributes=None, force=False):
+        """Sets every cell of the grid to the given character, and colors and attributes if
+           given."""
+        if self.stride != self.num_cols:
+            return GridView.fill(self, character, foreground, background, attributes, force)
+        return Line(self, 0, self.num_rows * self.num_cols).fill(character, foreground,
+                                                                  background, attributes, force)
+
+    def resize(self, num_rows, num_cols):
+        """Resizes the grid in place, keeping the contents of the overlapping region. Any newly
+           exposed cells are blank and marked as dirty. Within the capacity of the buffers only
+           the exposed cells are written; more rows extend the buffers, and only more columns than
+           ever before copy them into wider ones."""
+        if num_cols > self.stride:
+            self._reallocate(max(num_rows, self.capacity), num_cols)
+        elif num_rows > self.capacity:
+            extra = (num_rows - self.capacity) * self.stride
+            for name, typecode, value in self.BUFFERS:
+                getattr(self, name).extend(self._buffer(typecode, value, extra))
+            self.capacity = num_rows
+        # cells left over from when the grid was last this large must not show through
+        if num_cols > self.num_cols:
+            self._blank(0, min(num_rows, self.num_rows), self.num_cols, num_cols)
+        if num_rows > self.num_rows:
+            self._blank(self.num_rows, num_rows, 0, num_cols)
+        self.num_rows, self.num_cols = num_rows, num_cols
+        self.damage = {row_idx: [0, num_cols] for row_idx in range(num_rows)}
+
+    def _reallocate(self, capacity, stride):
+        """Moves the contents into new buffers with the given number of rows and row stride."""
+        for name, typecode, value in self.BUFFERS:
+            old, new = getattr(self, name), self._buffer(typecode, value, capacity * stride)
+            for row_idx in range(self.num_rows):
+                new[row_idx * stride:row_idx * stride + self.num_cols] = \
+                    old[row_idx * self.stride:row_idx * self.stride + self.num_cols]
+            setattr(self, name, new)
+        clusters = {}
+        for index, cluster in self.clusters.items():
+            row_idx, col_idx = divmod(index, self.stride)
+            if row_idx < self.num_rows and col_idx < self.num_cols:
+                clusters[row_idx * stride + col_idx] = cluster
+        self.clusters = clusters
+        self.stride, self.capacity = stride, capacity
+
+    def _blank(self, row_start, row_stop, col_start, col_stop):
+        """Resets a rectangle of the buffers to blank, uncolored and dirty cells that the screen
+           is not known to show."""
+        length = col_stop - col_start
+        for name, typecode, value in self.BUFFERS:
+            buf, blank = getattr(self, name), self._buffer(typecode, value, length)
+            for row_idx in range(row_start, row_stop):
+                buf[row_idx * self.stride + col_start:row_idx * self.stride + col_stop] = blank
+        for index in list(self.clusters):
+            row_idx, col_idx = divmod(index, self.stride)
+            if row_start <= row_idx < row_stop and col_start <= col_idx < col_stop:
+                del self.clusters[index]
+
+    def resync(self):
+        """Forgets what the screen is showing, so that the next draw() writes every cell. Needed
+           whenever the screen was cleared or reset behind the grid's back."""
+        size = self.capacity * self.stride
+        self.front_chars = self._buffer('I', UNKNOWN, size)
+        self.dirty = self._buffer(None, 1, size)
+        self.damage = {row_idx: [0, self.num_cols] for row_idx in range(self.num_rows)}
+
+    def set_cluster(self, index, cluster):
+        """Sets the cluster of characters shown in a cell, or removes it if cluster is None. The
+           cell is drawn again whatever the screen shows, as the front buffer only holds code
+           points."""
+        if cluster is None:
+            self.clusters.pop(index, None)
+        else:
+            self.clusters[index] = cluster
+        self.front_chars[index] = UNKNOWN
+
+    def replace_clusters(self, span, clusters):
+        """Replaces the clusters of the cells in the slice of the buffers with the given ones,
+           keyed by position within the slice. Returns True if anything changed."""
+        step = span.step or 1
+        cells = range(span.start, span.stop, step)
+        old = {index: self.clusters[index] for index in self.clusters if index in cells}
+        new = {span.start + cell * step: cluster for cell, cluster in (clusters or {}).items()}
+        if old == new:
+            return False
+        for index in old.keys() - new.keys():
+            self.set_cluster(index, None)
+        for index, cluster in new.items():
+            if old.get(index) != cluster:
+                self.set_cluster(index, cluster)
+        return True
+
+    def copy_style(self, source, target):
+        """Gives the cell at buffer index target the colors and attributes of the one at source.
+           Returns True if they were different."""
+        changed = False
+        for buf in (self.fg, self.bg, self.attrs):
+            if buf[target] != buf[source]:
+                buf[target] = buf[source]
+                changed = True
+        return changed
+
+    def repair_wide(self, start, stop):
+        """Keeps wide characters whole around the buffer range [start, stop) of a row that was
+           just written: a wide character whose right half was overwritten is blanked, and so is
+           a continuation cell left behind by one whose left half was."""
+        row_start = start - start % self.stride
+        if start > row_start and self.is_wide(self.chars[start - 1]):
+            self.chars[start - 1] = BLANK
+            self.mark(start - 1)
+        if stop < row_start + self.num_cols and self.chars[stop] == CONTINUATION and \
+           not self.is_wide(self.chars[stop - 1]):
+            self.chars[stop] = BLANK
+            self.mark(stop)
+
+    @staticmethod
+    def is_wide(code):
+        """Returns True if the code point is that of a character taking up two cells."""
+        return code != CONTINUATION and code > 0x7f and char_width(chr(code)) == 2
+
+    def text(self, start, stop, step=1):
+        """Returns what the cells in the buffer range [start, stop) show, clusters included and
+           continuation cells left out."""
+        chars = self.chars[start:stop:step]
+        if CONTINUATION not in chars and not self.clusters:
+            return chars.tobytes().decode(CODEC)
+        clusters = self.clusters
+        return ''.join(clusters.get(index) or chr(code)
+                       for index, code in zip(range(start, stop, step), chars)
+                       if code != CONTINUATION)
+
+    def mark(self, index):
+        """Flags the cell at the given buffer index as dirty and grows its row's damaged span."""
+        self.dirty[index] = 1
+        row_idx, col_idx = divmod(index, self.stride)
+        span = self.damage.get(row_idx)
+        if span is None:
+            self.damage[row_idx] = [col_idx, col_idx + 1]
+        elif col_idx < span[0]:
+            span[0] = col_idx
+        elif col_idx >= span[1]:
+            span[1] = col_idx + 1
+
+    def mark_line(self, start, length, stride=1):
+        """Flags every cell of a line as dirty, recording one span per row the line touches."""
+        if stride != 1:
+            for index in range(start, start + length * stride, stride):
+                self.mark(index)
+            return
+        self.dirty[start:start + length] = b'\x01' * length
+        row_idx, lo = divmod(start, self.stride)
+        while length > 0:
+            hi = min(lo + length, self.stride)
+            span = self.damage.get(row_idx)
+            if span is None:
+                self.damage[row_idx] = [lo, hi]
+            else:
+                span[0], span[1] = min(span[0], lo), max(span[1], hi)
+            length -= hi - lo
+            row_idx, lo = row_idx + 1, 0
+
+    def runs(self, start, stop):
+        """Splits the buffer range [start, stop) into runs of consecutive cells that share colors
+           and attributes, returned as (start, stop) pairs. A wide character always stays in one
+           run with its continuation cell."""
+        fg, bg, attrs = self.fg, self.bg, self.attrs
+        length = stop - start
+        if fg[start:stop] == array('h', [fg[start]]) * length and \
+           bg[start:stop] == array('h', [bg[start]]) * length and \
+           attrs[start:stop] == array('I', [attrs[start]]) * length:
+            return [(start, stop)]
+        runs = []
+        run_start = start
+        chars = self.chars
+        for index in range(start + 1, stop):
+            if chars[index] == CONTINUATION:
+                # never separate the halves of a wide character
+                continue
+            if fg[index] != fg[run_start] or bg[index] != bg[run_start] or \
+               attrs[index] != attrs[run_start]:
+                runs.append((run_start, index))
+                run_start = index
+        runs.append((run_start, stop))
+        return runs
+
+    def changed(self, start, stop):
+        """Narrows the buffer range [start, stop) down to the part from the first to the last cell
+           that differs from what the screen shows. Returns an empty range if none does."""
+        back = (self.chars, self.fg, self.bg, self.attrs)
+        front = (self.front_chars, self.front_fg, self.front_bg, self.front_attrs)
+        if all(b[start:stop] == f[start:stop] for b, f in zip(back, front)):
+            return stop, stop
+        while all(b[start] == f[start] for b, f in zip(back, front)):
+            start += 1
+        while all(b[stop - 1] == f[stop - 1] for b, f in zip(back, front)):
+            stop -= 1
+        return start, stop
+
+    def draw(self, screen, colors=None):
+        """Writes the dirty cells inside the damaged spans that differ from what the screen shows
+           to the given screen, then clears the dirty flags and the damage record. Rows that were
+           not touched are never visited, cells that were drawn over but ended up as they were are
+           skipped, and adjacent cells sharing colors and attributes are written with a single
+           addstr call. Colors are turned into attributes by the given ColorPairs, and ignored
+           without one. Returns the number of calls made and of cells written."""
+        dirty, chars, width = self.dirty, self.chars, self.stride
+        fg, bg, attrs = self.fg, self.bg, self.attrs
+        calls = cells = 0
+        for row_idx in sorted(self.damage):
+            lo, hi = self.damage[row_idx]
+            base = row_idx * width
+            stop = base + hi
+            start = dirty.find(1, base + lo, stop)
+            while start != -1:
+                end = dirty.find(0, start, stop)
+                end = stop if end == -1 else end
+                first, last = self.changed(start, end)
+                if first < last and chars[first] == CONTINUATION and first > base:
+                    # the right half of a wide character is drawn along with its left
+                    first -= 1
+                for run_start, run_stop in self.runs(first, last) if first < last else ():
+                    attr = attrs[run_start]
+                    if colors is not None and (fg[run_start] != NO_COLOR or
+                                               bg[run_start] != NO_COLOR):
+                        attr |= colors.attr(fg[run_start], bg[run_start])
+                    screen.addstr(row_idx, run_start - base, self.text(run_start, run_stop), attr)
+                    calls += 1
+                cells += last - first
+                self.front_chars[start:end] = chars[start:end]
+                self.front_fg[start:end] = fg[start:end]
+                self.front_bg[start:end] = bg[start:end]
+                self.front_attrs[start:end] = attrs[start:end]
+                start = dirty.find(1, end, stop)
+            dirty[base + lo:stop] = bytes(hi - lo)
+        self.damage.clear()
+        return calls, cells
@@ -0,0 +1,180 @@
+"""
+The recording module captures the stream of widget updates a running layout receives and replays
+it offline. A trace is a JSONL file: a header line with the screen size, then one line per update
+or resize with the time it happened at. Replaying drives the same layout on a VirtualScreen as
+fast as possible, frames being cut at the times they would have been at the given frame rate, so
+the frames per second and bytes per frame a build achieves can be measured on a real workload.
+
+    python -m terminological.recording TRACE module:layout_factory [--max-fps N]
+"""
+import sys
+import json
+import time
+import argparse
+import importlib
+
+from . import core
+from .backends import VirtualScreen
+from .scheduler import RenderScheduler
+
+# Widget methods whose calls are recorded, on whichever boxes have them
+RECORDED = ('add_message', 'add_messages', 'update')
+
+
+def box_path(root, box):
+    """Returns the path of a box in the tree below root: the child indices leading to it, joined
+       with dots. The root itself is the empty path."""
+    indices = []
+    while box is not root:
+        indices.append(str(box.parent_box.children.index(box)))
+        box = box.parent_box
+    return '.'.join(reversed(indices))
+
+
+def find_box(root, path):
+    """Returns the box at the given path below root."""
+    box = root
+    for index in path.split('.') if path else ():
+        box = box.children[int(index)]
+    return box
+
+
+def walk(box):
+    """Yields the box and every box below it."""
+    yield box
+    for child in box.children:
+        yield from walk(child)
+
+
+class Recorder(object):
+    """Writes the updates made to the boxes of a layout to a trace file. Only the boxes in the
+       tree when attach() is called are recorded."""
+    def __init__(self, file, clock=time.monotonic):
+        self.file = file
+        self.clock = clock
+        self.root = None
+        self.events = 0
+        self._start = None
+
+    def attach(self, root):
+        """Starts recording the updates of root and its current children, and the resizes of
+           root. Returns the recorder."""
+        self.root = root
+        self._start = self.clock()
+        height, width = core.SCREEN.getmaxyx() if core.SCREEN else (root.height, root.width + 1)
+        self._write({'size': [height, width]})
+        for box in walk(root):
+            path = box_path(root, box)
+            for name in RECORDED:
+                if hasattr(box, name):
+                    setattr(box, name, self._recording(path, name, getattr(box, name)))
+        root.resize = self._recording_resize(root.resize)
+        return self
+
+    def detach(self):
+        """Stops recording and restores the original methods of the boxes."""
+        for box in walk(self.root):
+            for name in RECORDED + ('resize',):
+                box.__dict__.pop(name, None)
+        self.root = None
+
+    def _write(self, event):
+        self.file.write(json.dumps(event, separators=(',', ':')) + '\n')
+
+    def _recording(self, path, name, method):
+        def record(*args, **kwargs):
+            if name == 'add_messages':
+                args = (list(args[0]),) + args[1:]
+            self._write({'t': self.clock() - self._start, 'box': path, 'call': name,
+                         'args': args, 'kwargs': kwargs})
+            self.events += 1
+            return method(*args, **kwargs)
+        return record
+
+    def _recording_resize(self, method):
+        def record(new_height=None, new_width=None):
+            size = core.SCREEN.getmaxyx() if core.SCREEN else (new_height, new_width)
+            self._write({'t': self.clock() - self._start, 'resize': list(size)})
+            self.events += 1
+            return method(new_height, new_width)
+        return record
+
+
+class ReplayResult(object):
+    """What replaying a trace took: the number of events and frames, the seconds spent, and the
+       output calls and bytes written to the screen."""
+    def __init__(self, events, frames, seconds, calls, bytes_written):
+        self.events = events
+        self.frames = frames
+        self.seconds = seconds
+        self.calls = calls
+        self.bytes = bytes_written
+
+    @property
+    def fps(self):
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_frame(self):
+        return self.bytes / self.frames if self.frames else 0.0
+
+    def as_dict(self):
+        return {'events': self.events, 'frames': self.frames, 'seconds': self.seconds,
+                'fps': self.fps, 'calls': self.calls, 'bytes': self.bytes,
+                'bytes_per_frame': self.bytes_per_frame}
+
+
+def replay(lines, root, max_fps=30):
+    """Replays the trace in lines (a file or any iterable of its lines) on root, drawing on a fresh
+       VirtualScreen. Time is taken from the trace, so frames are coalesced exactly as they would
+       have been at max_fps, while the replay itself runs as fast as it can. Returns a
+       ReplayResult for everything after the initial layout."""
+    lines = iter(lines)
+    height, width = json.loads(next(lines))['size']
+    screen = VirtualScreen(height, width, record=False)
+    trace_time = [0.0]
+    scheduler = RenderScheduler(root, max_fps, clock=lambda: trace_time[0])
+    core.set_screen(screen)
+    try:
+        root.resize(None, None)
+        root.scheduler = scheduler
+        del screen.frames[:]
+        events = 0
+        start = time.perf_counter()
+        for line in lines:
+            event = json.loads(line)
+            trace_time[0] = event['t']
+            if 'resize' in event:
+                screen.resize(*event['resize'])
+                root.resync()
+                scheduler.request_resize()
+            else:
+                box = find_box(root, event['box'])
+                getattr(box, event['call'])(*event['args'], **event['kwargs'])
+            events += 1
+        if scheduler.pending:
+            scheduler.render()
+        seconds = time.perf_counter() - start
+    finally:
+        root.scheduler = None
+        core.clear_screen()
+    return ReplayResult(events, len(screen.frames), seconds,
+                        sum(frame.calls for frame in screen.frames),
+                        sum(frame.bytes for frame in screen.frames))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('trace', type=argparse.FileType('r'), help='JSONL trace to replay')
+    parser.add_argument('layout', help='module:callable returning the base box the trace was '
+                                       'recorded on')
+    parser.add_argument('--max-fps', type=float, default=30)
+    args = parser.parse_args(argv)
+    module, _, factory = args.layout.partition(':')
+    root = getattr(importlib.import_module(module), factory)()
+    result = replay(args.trace, root, args.max_fps)
+    sys.stdout.write(json.dumps(result.as_dict()) + '\n')
+
+
+if __name__ == '__main__':
+    main()
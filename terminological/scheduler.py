@@ -0,0 +1,143 @@
+"""
+The scheduler module decouples how often widgets change from how often the terminal is redrawn.
+Widgets report changes to the scheduler of their base box, which coalesces them into frames, and
+other threads hand their updates to the scheduler's mailbox to be applied on the render thread.
+"""
+import time
+import threading
+from collections import deque
+
+from .stats import CONTENT
+
+
+class RenderScheduler(object):
+    """Collects redraw requests from the boxes of one tree and renders them as frames, at most
+       max_fps of them a second. Requests arriving in between frames are coalesced, so a box that
+       changes a thousand times between two frames is only drawn once."""
+    def __init__(self, root, max_fps=30, clock=time.monotonic):
+        self.root = root
+        self.interval = 1.0 / max_fps if max_fps else 0
+        self.clock = clock
+        self.frames = 0
+        self.thread = None
+        # called with no arguments whenever a request is left waiting for a later frame
+        self.on_pending = None
+        # called with no arguments right before a requested resize is carried out
+        self.on_resize = None
+        self._resize = False
+        self._draining = False
+        self._pending = {}
+        self._last_frame = None
+        # deque.append and deque.popleft are atomic, so producers never need to take a lock
+        self._mailbox = deque()
+
+    @property
+    def pending(self):
+        """Property, True if there are requests waiting for the next frame."""
+        return bool(self._pending)
+
+    def request(self, box):
+        """Queues the given box to be redrawn on the next frame. Without a render thread, the frame
+           is rendered right away if one is already due."""
+        self._pending[box] = None
+        if self.thread is None and not self._draining:
+            self.tick()
+        if self._pending and self.on_pending is not None:
+            self.on_pending()
+
+    def request_resize(self):
+        """Queues the base box to be laid out again on the next frame, typically because the
+           terminal was resized. However many resizes arrive in between two frames, they are
+           handled with a single layout pass."""
+        self._resize = True
+        self.request(self.root)
+
+    def post(self, func, *args, **kwargs):
+        """Queues a call, typically a widget update, to be made on the render thread before the
+           next frame. Safe to call from any thread; it never blocks and never touches the
+           screen."""
+        self._mailbox.append((func, args, kwargs))
+
+    def drain(self):
+        """Makes every call that has been posted so far. Returns the number of calls made."""
+        mailbox = self._mailbox
+        count = len(mailbox)
+        self._draining = True
+        try:
+            for _ in range(count):
+                func, args, kwargs = mailbox.popleft()
+                func(*args, **kwargs)
+        finally:
+            self._draining = False
+        return count
+
+    def next_frame_in(self):
+        """Returns the number of seconds until another frame may be rendered."""
+        if self._last_frame is None:
+            return 0
+        return max(0, self._last_frame + self.interval - self.clock())
+
+    def due(self):
+        """Returns True if enough time has passed since the last frame to render another."""
+        return self._last_frame is None or \
+            self.clock() - self._last_frame >= self.interval
+
+    def tick(self):
+        """Applies posted calls, then renders a frame if anything is pending and the frame interval
+           has elapsed. Returns True if a frame was rendered."""
+        self.drain()
+        if self._pending and self.due():
+            self.render()
+            return True
+        return False
+
+    def render(self):
+        """Draws every pending box and flushes the base box to the screen, regardless of timing. A
+           pending resize lays out and draws the whole tree, which covers every other request."""
+        pending, self._pending = self._pending, {}
+        if self._resize:
+            self._resize = False
+            if self.on_resize is not None:
+                self.on_resize()
+            # the base box draws and flushes itself once laid out
+            self.root.resize(None, None)
+        else:
+            stats = self.root.stats
+            if stats is not None:
+                stats.enter(CONTENT)
+            for box in pending:
+                # a box may have lost its cells, e.g. been scrolled out, since it asked to be drawn
+                if box.matrix:
+                    box.draw()
+            if stats is not None:
+                stats.exit()
+            self.root.flush()
+        self._last_frame = self.clock()
+        self.frames += 1
+
+
+class RenderThread(threading.Thread):
+    """Drives a scheduler from a background thread that ticks it once per frame interval. While it
+       runs, the scheduler never renders on the calling thread, so widgets must only be updated
+       through RenderScheduler.post()."""
+    def __init__(self, scheduler):
+        threading.Thread.__init__(self, name='terminological-render', daemon=True)
+        self.scheduler = scheduler
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.scheduler.thread = self
+        threading.Thread.start(self)
+
+    def run(self):
+        while not self._stopped.wait(self.scheduler.interval):
+            self.scheduler.tick()
+
+    def stop(self):
+        """Stops the thread, then applies and renders whatever was still queued."""
+        self._stopped.set()
+        self.join()
+        self.scheduler.thread = None
+        self.scheduler.drain()
+        if self.scheduler.pending:
+            self.scheduler.render()
@@ -0,0 +1,211 @@
+"""
+The scrollback module contains a message log whose history lives in an append-only file instead of
+memory, so it can be kept for as long as the file system allows and scrolled back through at any
+time. The log is a plain UTF-8 text file with one line per record; a sidecar index file next to it
+holds where each record ends and how many columns it takes up, which is all that is needed to lay
+the log out at any width without reading it. Only records with characters outside of ASCII are
+read to be laid out, since a wide character that does not fit at the end of a line moves to the
+next one.
+"""
+import os
+import mmap
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain, islice
+
+from .core import MsgLog, OutlineType
+from .utils import split, string_width, INF
+
+INDEX_SUFFIX = '.idx'
+
+
+class ScrollbackLog(MsgLog):
+    """A MsgLog backed by a memory-mapped log file. Only the records that end up on screen are ever
+       read and decoded. It follows the end of the log like MsgLog until it is scrolled, after which
+       it stays at the same wrapped line until scrolled again or sent back to the end."""
+    def __init__(self, path, height=0, width=0, parent_box=None,
+                 matrix=None, weight=1, max_size=INF, min_size=0,
+                 outline=OutlineType.No):
+        MsgLog.__init__(self, None, height, width, parent_box, matrix, weight,
+                        max_size, min_size, outline=outline)
+        # nothing is kept in memory, the file is the history
+        self.message_history = self._wrapped = None
+        self.path = path
+        self.scroll = None
+        self._log = open(path, 'ab+')
+        self._index_file = open(path + INDEX_SUFFIX, 'ab+')
+        self._map = None
+        # per record: the offset just past its newline, and its width in columns
+        self._ends, self._lengths = array('Q'), array('Q')
+        # per record: the first wrapped line it occupies at _line_width, plus the total at the end
+        self._line_width, self._line_starts = None, None
+        self._load_index()
+
+    def __len__(self):
+        """Returns the number of records in the log, a message with line breaks being several."""
+        return len(self._ends)
+
+    def _load_index(self):
+        """Reads the sidecar index and brings it up to date with the log, which is ahead of it if
+           the process stopped between writing one and the other, or if the log was written by
+           something else."""
+        size = os.fstat(self._log.fileno()).st_size
+        self._index_file.seek(0)
+        data = self._index_file.read()
+        index = array('Q')
+        index.frombytes(data[:len(data) - len(data) % (2 * index.itemsize)])
+        self._ends, self._lengths = index[0::2], index[1::2]
+        if self._ends and self._ends[-1] > size:
+            # the log was truncated or replaced, the index is of no use
+            self._ends, self._lengths = array('Q'), array('Q')
+        if len(self._ends) * 2 * index.itemsize != len(data):
+            self._index_file.truncate(0)
+            self._write_index(0)
+        start = self._ends[-1] if self._ends else 0
+        if start < size:
+            self._log.seek(start)
+            tail = self._log.read()
+            if not tail.endswith(b'\n'):
+                # complete a record cut short, so the next one does not run into it
+                self._log.write(b'\n')
+                self._log.flush()
+                tail += b'\n'
+            first = len(self._ends)
+            for line in tail[:-1].split(b'\n'):
+                start += len(line) + 1
+                self._ends.append(start)
+                self._lengths.append(string_width(line.decode('utf-8', 'replace')))
+            self._write_index(first)
+
+    def _write_index(self, first):
+        """Appends the index entries of the records from first on to the sidecar index file."""
+        index = array('Q', [0]) * (2 * (len(self._ends) - first))
+        index[0::2], index[1::2] = self._ends[first:], self._lengths[first:]
+        self._index_file.seek(0, os.SEEK_END)
+        index.tofile(self._index_file)
+        self._index_file.flush()
+
+    def _append(self, msgs):
+        """Writes the messages to the end of the log, one record per line of each message."""
+        first = len(self._ends)
+        end = self._ends[-1] if self._ends else 0
+        chunks = []
+        for msg in msgs:
+            for line in msg.replace('\t', '    ').split('\n'):
+                chunk = line.encode('utf-8', 'replace') + b'\n'
+                end += len(chunk)
+                chunks.append(chunk)
+                self._ends.append(end)
+                self._lengths.append(string_width(line))
+        self._log.seek(0, os.SEEK_END)
+        self._log.write(b''.join(chunks))
+        self._log.flush()
+        self._write_index(first)
+        if self._line_width is not None:
+            self._extend_line_starts(first)
+
+    def add_message(self, msg):
+        self._append([msg])
+        if not self._batch_depth:
+            self.invalidate()
+
+    def add_messages(self, msgs):
+        """Appends every message in the given iterable and then redraws once."""
+        with self.batch():
+            self._append(msgs)
+
+    def close(self):
+        """Closes the log and its index. The box must not be drawn again afterwards."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._log.close()
+        self._index_file.close()
+
+    def _record(self, idx):
+        """Returns the text of a record, read through the memory map of the log."""
+        end = self._ends[-1]
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._log.fileno(), end, access=mmap.ACCESS_READ)
+        start = self._ends[idx - 1] if idx else 0
+        return self._map[start:self._ends[idx] - 1].decode('utf-8', 'replace')
+
+    def _lines(self, width):
+        """Returns the first wrapped line of every record at the given width, followed by the
+           total number of wrapped lines. Built on first use at each width, and kept up to date as
+           records are added."""
+        if self._line_width != width:
+            self._line_width = width
+            self._line_starts = array('Q', [0])
+            self._extend_line_starts(0)
+        return self._line_starts
+
+    def _extend_line_starts(self, first):
+        width, ends, lengths = self._line_width, self._ends, self._lengths
+        counts = []
+        for idx in range(first, len(ends)):
+            size = ends[idx] - (ends[idx - 1] if idx else 0) - 1
+            if size == lengths[idx]:
+                # one byte per column means plain ASCII, which wraps at exactly width columns
+                counts.append((size + width - 1) // width)
+            else:
+                counts.append(len(split(self._record(idx), width)))
+        totals = accumulate(chain([self._line_starts[-1]], counts))
+        self._line_starts.extend(islice(totals, 1, None))
+
+    @property
+    def line_count(self):
+        """Property, returns the number of wrapped lines the whole log takes up at the current
+           width."""
+        _, width, _, _ = self._outline_offsets()
+        return self._lines(width)[-1] if width > 0 else 0
+
+    def scroll_to(self, line):
+        """Scrolls so that the given wrapped line is at the top of the box. Positions past the point
+           where the last line reaches the bottom are clamped to it."""
+        height, width, _, _ = self._outline_offsets()
+        if width > 0:
+            line = min(line, self._lines(width)[-1] - height)
+        self.scroll = max(0, line)
+        self.invalidate()
+
+    def scroll_by(self, lines):
+        """Scrolls the given number of wrapped lines towards the end (or start, if negative) of the
+           log."""
+        if self.scroll is None:
+            height, width, _, _ = self._outline_offsets()
+            self.scroll = max(0, self._lines(width)[-1] - height) if width > 0 else 0
+        self.scroll_to(self.scroll + lines)
+
+    def scroll_to_end(self):
+        """Goes back to following the end of the log."""
+        self.scroll = None
+        self.invalidate()
+
+    def _visible_lines(self, height, width):
+        """Returns the height wrapped lines on screen, oldest first: the end of the log when
+           following it, otherwise the lines from the scroll position on. The position is found
+           with a binary search over the line index, and only the records on screen are read."""
+        if height <= 0 or width <= 0 or not self._ends:
+            return []
+        if self.scroll is None:
+            chunks = []
+            count = 0
+            for idx in range(len(self._ends) - 1, -1, -1):
+                if count >= height:
+                    break
+                chunks.append(split(self._record(idx), width))
+                count += len(chunks[-1])
+            display = [line for chunk in reversed(chunks) for line in chunk]
+            return display[max(0, count - height):]
+        starts = self._lines(width)
+        top = min(self.scroll, max(0, starts[-1] - height))
+        idx = bisect_right(starts, top, 0, len(self._ends)) - 1
+        display = []
+        skip = top - starts[idx]
+        while idx < len(self._ends) and len(display) < skip + height:
+            display.extend(split(self._record(idx), width))
+            idx += 1
+        return display[skip:skip + height]
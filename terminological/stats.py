@@ -0,0 +1,68 @@
+"""
+The stats module contains the opt-in instrumentation of the render path. When a base box has
+RenderStats enabled, every frame reports how long was spent in each rendering phase and how many
+cells and screen calls it took.
+"""
+import time
+from collections import deque
+
+# Rendering phases, in the order they usually happen within a frame
+LAYOUT = 'layout'
+CONTENT = 'content'
+DIFF = 'diff'
+OUTPUT = 'output'
+PHASES = (LAYOUT, CONTENT, DIFF, OUTPUT)
+
+
+class FrameRecord(object):
+    """Timings (in seconds) and counters of a single frame. Phase times are exclusive: time spent
+       diffing cells while a widget generates its content counts towards diff, not content."""
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.cells_touched = 0
+        self.cells_flushed = 0
+        self.calls = 0
+
+    def __repr__(self):
+        return 'FrameRecord({}, cells_touched={}, cells_flushed={}, calls={})'.format(
+            ', '.join('{}={:.6f}'.format(phase, self.times[phase]) for phase in PHASES),
+            self.cells_touched, self.cells_flushed, self.calls)
+
+
+class RenderStats(object):
+    """Collects a FrameRecord per frame for one base box, keeping the last history of them and
+       handing each one to callback, if given, as soon as the frame has been flushed."""
+    def __init__(self, callback=None, history=120, clock=time.perf_counter):
+        self.callback = callback
+        self.clock = clock
+        self.frames = deque(maxlen=history)
+        self.frame = FrameRecord()
+        self._stack = []
+        self._since = 0.0
+
+    def enter(self, phase):
+        """Starts timing the given phase, pausing whichever phase it is nested in."""
+        now = self.clock()
+        if self._stack:
+            self.frame.times[self._stack[-1]] += now - self._since
+        self._stack.append(phase)
+        self._since = now
+
+    def exit(self):
+        """Stops timing the current phase and resumes the one it was nested in."""
+        now = self.clock()
+        self.frame.times[self._stack.pop()] += now - self._since
+        self._since = now
+
+    def end_frame(self):
+        """Closes the current frame record and starts a new one. A phase still in progress is
+           credited to the closing frame up to this point."""
+        if self._stack:
+            now = self.clock()
+            self.frame.times[self._stack[-1]] += now - self._since
+            self._since = now
+        frame, self.frame = self.frame, FrameRecord()
+        self.frames.append(frame)
+        if self.callback is not None:
+            self.callback(frame)
+        return frame
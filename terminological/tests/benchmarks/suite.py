@@ -0,0 +1,213 @@
+"""
+Benchmarks for the hot paths of terminological: layout, resizing, drawing, logging and progress bar
+updates. Every scenario runs against a headless VirtualScreen and prints one JSON object per line,
+so results from different versions can be compared with standard tools.
+
+    python -m terminological.tests.benchmarks.suite [--quick] [--only NAME] [--output FILE]
+"""
+import sys
+import json
+import time
+import argparse
+from itertools import product
+
+from terminological import core
+from terminological.core import HorizontalBox, VerticalBox, Filler, MsgLog, ScrollBox
+from terminological.core import gen_matrix, resize_matrix, compute_sizes, set_screen, clear_screen
+from terminological.utils import INF
+from terminological.widgets import LabeledProgressBar
+from terminological.backends import VirtualScreen
+
+SCREENS = [(24, 80), (50, 160), (120, 400)]
+DEPTHS = [1, 2, 4, 8]
+MESSAGES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+ROWS = [100, 5000]
+
+QUICK_SCREENS = [(24, 80)]
+QUICK_DEPTHS = [1, 2]
+QUICK_MESSAGES = [10 ** 2]
+QUICK_ROWS = [100]
+
+SCENARIOS = []
+
+
+def scenario(**param_grid):
+    """Registers a benchmark. The decorated function receives one combination of the parameters,
+       does its setup and returns the zero-argument callable to be timed."""
+    def register(func):
+        SCENARIOS.append((func.__name__, func, param_grid))
+        return func
+    return register
+
+
+def nested_layout(depth, leaf=lambda: Filler('.')):
+    """Returns a tree of the given depth alternating horizontal and vertical boxes. Every level
+       holds a leaf next to the next level down."""
+    box = leaf()
+    for level in range(depth):
+        container = HorizontalBox() if level % 2 else VerticalBox()
+        box = container.add_child(leaf()).add_child(box)
+    return box
+
+
+def headless(height, width):
+    """Points SCREEN at a fresh VirtualScreen that does not keep a log of its writes."""
+    screen = VirtualScreen(height, width + 1, record=False)
+    set_screen(screen)
+    return screen
+
+
+@scenario(children=[2, 8, 64], total_size=[80, 400, 4000], skew=[1, 97])
+def compute_sizes_layout(children, total_size, skew):
+    dimension_list = [(0, skew if i == 0 else 1, 0, INF) for i in range(children)]
+    return lambda: compute_sizes(dimension_list, total_size)
+
+
+@scenario(screen=SCREENS)
+def resize_matrix_grow_shrink(screen):
+    height, width = screen
+    matrix = gen_matrix(height // 2, width // 2)
+
+    def run():
+        resize_matrix(matrix, height, width)
+        resize_matrix(matrix, height // 2, width // 2)
+    return run
+
+
+@scenario(screen=SCREENS, depth=DEPTHS)
+def box_resize_and_draw(screen, depth):
+    height, width = screen
+    virtual_screen = headless(height, width)
+    root = nested_layout(depth)
+
+    def run():
+        # what a terminal being shrunk and grown back again triggers
+        for rows, cols in ((height // 2, width // 2), (height, width)):
+            virtual_screen.resize(rows, cols + 1)
+            root.resize(None, None)
+    return run
+
+
+@scenario(screen=SCREENS, depth=DEPTHS)
+def box_draw_steady_state(screen, depth):
+    height, width = screen
+    headless(height, width)
+    root = nested_layout(depth)
+    root.resize(height, width)
+    return root.draw
+
+
+@scenario(screen=SCREENS, messages=MESSAGES)
+def msg_log_add_messages(screen, messages):
+    height, width = screen
+    headless(height, width)
+    root = HorizontalBox().add_child(MsgLog(history_max=messages))
+    root.resize(height, width)
+    log = root.children[0]
+    lines = ['log line {} '.format(i) * (1 + i % 7) for i in range(messages)]
+
+    def run():
+        log.add_messages(lines)
+        root.flush()
+    return run
+
+
+@scenario(screen=SCREENS, messages=MESSAGES)
+def msg_log_draw(screen, messages):
+    height, width = screen
+    headless(height, width)
+    root = HorizontalBox().add_child(MsgLog(history_max=messages))
+    root.resize(height, width)
+    log = root.children[0]
+    log.add_messages('log line {} '.format(i) * (1 + i % 7) for i in range(messages))
+
+    def run():
+        log.draw()
+        root.flush()
+    return run
+
+
+@scenario(screen=SCREENS, bars=[1, 8])
+def progress_bar_update(screen, bars):
+    height, width = screen
+    headless(height, width)
+    root = VerticalBox()
+    progress_bars = [LabeledProgressBar('bar {}'.format(i), min_size=3, max_size=3)
+                     for i in range(bars)]
+    [root.add_child(bar) for bar in progress_bars]
+    root.resize(height, width)
+
+    def run():
+        for percentage in range(101):
+            for bar in progress_bars:
+                bar.update(percentage=percentage)
+            root.flush()
+    return run
+
+
+@scenario(screen=SCREENS, rows=ROWS)
+def scroll_box_scroll(screen, rows):
+    height, width = screen
+    headless(height, width)
+    root = ScrollBox()
+    [root.add_child(Filler(str(i % 10))) for i in range(rows)]
+
+    def run():
+        # a root box flushes every scroll step by itself
+        for _ in range(height):
+            root.scroll_by(1)
+    return run
+
+
+def run_scenario(func, params, repeat):
+    """Times one combination of parameters and returns its result record."""
+    timed = func(**params)
+    screen = core.SCREEN
+    times = []
+    for _ in range(repeat):
+        if screen is not None:
+            screen.frames = []
+        start = time.perf_counter()
+        timed()
+        times.append(time.perf_counter() - start)
+    record = {'params': params, 'repeat': repeat, 'best': min(times),
+              'mean': sum(times) / len(times)}
+    if screen is not None:
+        record['frames'] = len(screen.frames)
+        record['calls'] = sum(f.calls for f in screen.frames)
+        record['bytes'] = sum(f.bytes for f in screen.frames)
+    clear_screen()
+    return record
+
+
+def run(quick=False, only=None, repeat=5):
+    """Runs the registered scenarios and yields one result record for each parameter combination.
+       Quick mode swaps the screen, depth, message and row grids for small ones."""
+    quick_grids = {'screen': QUICK_SCREENS, 'depth': QUICK_DEPTHS, 'messages': QUICK_MESSAGES,
+                   'rows': QUICK_ROWS}
+    for name, func, param_grid in SCENARIOS:
+        if only and only not in name:
+            continue
+        grid = {key: (quick_grids.get(key, values) if quick else values)
+                for key, values in param_grid.items()}
+        for values in product(*grid.values()):
+            params = dict(zip(grid.keys(), values))
+            record = run_scenario(func, params, 1 if quick else repeat)
+            record['benchmark'] = name
+            yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='run small parameter grids only')
+    parser.add_argument('--only', help='run only benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per combination')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+    for record in run(args.quick, args.only, args.repeat):
+        args.output.write(json.dumps(record) + '\n')
+        args.output.flush()
+
+
+if __name__ == '__main__':
+    main()
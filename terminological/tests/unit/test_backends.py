@@ -0,0 +1,198 @@
+import curses
+import pytest
+
+from terminological.core import HorizontalBox, VerticalBox, Filler, MsgLog, OutlineType
+from terminological.core import start, screen_to_string, clear_screen, set_screen, get_key
+from terminological.widgets import LabeledProgressBar
+from terminological.backends import VirtualScreen, AnsiScreen
+from terminological.grid import NO_COLOR
+
+
+def test_virtual_screen():
+    screen = VirtualScreen(2, 4)
+    screen.addstr(0, 2, 'abcd')
+    assert str(screen) == '  ab\ncd  '
+    assert screen.inch(1, 1) == ord('d')
+    with pytest.raises(curses.error):
+        screen.addstr(1, 2, 'xyz')
+    with pytest.raises(curses.error):
+        screen.addstr(2, 0, 'x')
+    screen.refresh()
+    assert [(f.calls, f.cells) for f in screen.frames] == [(2, 7)]
+
+
+def test_virtual_screen_wide_characters():
+    screen = VirtualScreen(2, 5)
+    screen.addstr(0, 0, '中e\u0301x')
+    assert screen.contents() == ['中e\u0301x ', '     ']
+    screen.refresh()
+    assert screen.frames[0].cells == 4
+
+    set_screen(screen)
+    log = MsgLog(height=2, width=5)
+    log.add_message('中文字')
+    log.draw()
+    log.flush()
+    clear_screen()
+    assert screen.contents() == ['中文 ', '字   ']
+
+    screen = VirtualScreen(3, 6)
+    start(VerticalBox().add_child(Filler('中')), screen=screen)
+    assert screen.contents() == ['中中  '] * 3
+
+
+def test_headless_start():
+    screen = VirtualScreen(24, 81)
+    H = HorizontalBox(outline=OutlineType.HorizontalBounds)\
+        .add_child(VerticalBox(outline=OutlineType.VerticalBounds)
+                   .add_child(Filler('L')))\
+        .add_child(VerticalBox(outline=OutlineType.VerticalBounds)
+                   .add_child(Filler('R')))
+
+    def main():
+        assert H.height == 24 and H.width == 80
+        assert str(H) == screen_to_string()
+        clear_screen()
+
+    start(H, main, screen=screen)
+    # the first frame paints the whole screen with a handful of calls per row
+    assert screen.frames[0].cells >= 24 * 80
+    assert screen.frames[0].calls <= 24 * 6
+
+
+def test_headless_render_loop():
+    screen = VirtualScreen(10, 41)
+    B = HorizontalBox(outline=OutlineType.VerticalBoundBox).add_child(MsgLog())
+    log = B.children[0]
+
+    def main():
+        del screen.frames[:]
+        for i in range(100):
+            log.add_message('message {}'.format(i))
+            B.flush()
+        assert str(B) == screen_to_string()
+        clear_screen()
+
+    start(B, main, screen=screen)
+    assert len(screen.frames) == 100
+    # scrolling the log rewrites its 8 visible lines, nothing else
+    assert all(frame.calls <= 8 for frame in screen.frames)
+
+
+def test_start_renders_final_updates():
+    screen = VirtualScreen(3, 11)
+    log = MsgLog()
+    root = VerticalBox().add_child(log)
+
+    def main():
+        log.add_message('one')
+        log.add_message('two')
+        assert root.scheduler.pending
+
+    start(root, main, screen=screen, max_fps=30)
+    # the update left waiting for the next frame is rendered before start() returns
+    assert screen.contents()[:2] == ['one        ', 'two        ']
+    assert root.scheduler is None
+
+
+def test_start_render_thread():
+    screen = VirtualScreen(3, 11)
+    log = MsgLog()
+    root = VerticalBox().add_child(log)
+
+    def main():
+        # a scheduler is set up at its default rate for the render thread to drive
+        assert root.scheduler.thread is not None
+        root.scheduler.post(log.add_message, 'posted')
+
+    start(root, main, screen=screen, render_thread=True)
+    assert screen.contents()[0] == 'posted     '
+    with pytest.raises(ValueError):
+        start(root, main, screen=screen, max_fps=0)
+
+
+def test_get_key_handles_resizes():
+    screen = VirtualScreen(10, 21)
+    log = MsgLog()
+    root = VerticalBox().add_child(log)
+    layouts = []
+
+    def main():
+        resize = root.resize
+        root.resize = lambda *size: layouts.append(screen.getmaxyx()) or resize(*size)
+        log.add_message('one')
+        log.add_message('two')
+        screen.keys.extend([ord('a'), curses.KEY_RESIZE])
+        assert get_key(root) == ord('a')
+        # a terminal edge being dragged within one frame
+        screen.resize(8, 21)
+        screen.keys.append(curses.KEY_RESIZE)
+        screen.resize(6, 21)
+        screen.keys.extend([curses.KEY_RESIZE, ord('q')])
+        assert get_key(root) == ord('q')
+        assert get_key(root, timeout=0.3) == -1
+
+    start(root, main, screen=screen, max_fps=10)
+    # both resizes are laid out in one pass at the final size, along with the pending update
+    assert layouts == [(6, 21)]
+    assert root.height == 6 and screen.contents()[:2] == ['one                  ',
+                                                          'two                  ']
+
+
+def test_front_buffer_diff():
+    screen = VirtualScreen(3, 13)
+    set_screen(screen)
+    root = VerticalBox()
+    root.add_child(LabeledProgressBar('bar', min_size=3, max_size=3))
+    del screen.frames[:]
+    # the outline blanks the title row before the title is written over it again, which ends up
+    # as what the screen already shows
+    root.draw()
+    assert screen.frames[-1].calls == 0
+    screen.clear()
+    root.resync()
+    root.draw()
+    assert screen.frames[-1].cells == 3 * 12
+    assert screen_to_string() == str(root)
+    clear_screen()
+
+
+def test_ansi_screen_sequences(tmp_path):
+    with open(str(tmp_path / 'out'), 'w+b') as out:
+        screen = AnsiScreen(out.fileno(), 3, 10, alternate=False)
+        screen.init_pair(1, 2, NO_COLOR)
+        screen.addstr(0, 0, 'ab')
+        # no cursor move when carrying on where the last write ended, no SGR if unchanged
+        screen.addstr(0, 2, 'cd', screen.color_pair(1) | curses.A_BOLD)
+        screen.addstr(2, 5, 'ef', screen.color_pair(1) | curses.A_BOLD)
+        screen.refresh()
+        screen.refresh()
+        assert screen.writes == 1
+        out.seek(0)
+        assert out.read() == b'\x1b[1;1H\x1b[0mab\x1b[0;1;32;49mcd\x1b[3;6Hef'
+    with pytest.raises(curses.error):
+        screen.addstr(3, 0, 'x')
+
+
+def test_ansi_start(tmp_path):
+    path = str(tmp_path / 'recording')
+    H = HorizontalBox(outline=OutlineType.Box).add_child(Filler('x'))
+
+    def main():
+        H.children[0].character = 'y'
+        H.draw()
+        # what was written is mirrored, so the screen can be read back like any other
+        assert screen_to_string() == str(H)
+        assert screen.contents()[1] == '│yyyyyy│ '
+
+    with open(path, 'wb') as out:
+        screen = AnsiScreen(out.fileno(), 4, 9)
+        start(H, main, screen=screen)
+    # the first frame carries the setup along, then the second frame and the teardown
+    assert screen.writes == 3
+    with open(path, 'rb') as out:
+        output = out.read().decode('utf-8')
+    assert output.startswith('\x1b[?1049h\x1b[?25l\x1b[0m\x1b[2J')
+    assert output.endswith('\x1b[0m\x1b[?25h\x1b[?1049l')
+    assert '┌──────┐' in output and 'xxxxxx' in output and 'yyyyyy' in output
+    clear_screen()
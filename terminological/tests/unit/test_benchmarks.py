@@ -0,0 +1,16 @@
+import json
+
+from terminological import core
+from terminological.tests.benchmarks import suite
+
+
+def test_benchmark_suite_quick(tmpdir):
+    output = tmpdir.join('bench.jsonl')
+    suite.main(['--quick', '--only', 'box_', '--output', str(output)])
+    records = [json.loads(line) for line in output.readlines()]
+    assert {r['benchmark'] for r in records} == {'box_resize_and_draw', 'box_draw_steady_state',
+                                                   'scroll_box_scroll'}
+    assert all(r['best'] > 0 for r in records)
+    # a steady state frame produces no output at all
+    assert all(r['calls'] == 0 for r in records if r['benchmark'] == 'box_draw_steady_state')
+    assert core.SCREEN is None
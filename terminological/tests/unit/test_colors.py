@@ -0,0 +1,59 @@
+import curses
+
+from terminological.core import HorizontalBox, Filler, set_screen, clear_screen
+from terminological.grid import Grid, NO_COLOR
+from terminological.colors import ColorPairs
+from terminological.backends import VirtualScreen
+
+
+def test_color_pairs_lru():
+    screen = VirtualScreen(1, 4)
+    pairs = ColorPairs(screen, max_pairs=2)
+    red, green = pairs.attr(1, NO_COLOR), pairs.attr(2, NO_COLOR)
+    assert (red, green) == (1 << 8, 2 << 8)
+    assert screen.pairs == {1: (1, NO_COLOR), 2: (2, NO_COLOR)}
+    # a hit makes red the most recently used, so green is the pair that gets redefined
+    assert pairs.attr(1, NO_COLOR) == red
+    assert pairs.attr(3, 4) == green
+    assert screen.pairs[2] == (3, 4)
+    assert len(pairs) == 2
+    assert (pairs.stats.hits, pairs.stats.misses) == (1, 3)
+    # without pairs to offer, everything is drawn in the default colors
+    assert ColorPairs(screen, max_pairs=0).attr(1, 2) == 0
+
+
+def test_colored_draw():
+    screen = VirtualScreen(2, 6)
+    grid = Grid(2, 6)
+    grid.fill('a')
+    grid.view(0, 1, 2, 2).fill('b', foreground=1, background=2)
+    grid[1][5].set('c', attributes=curses.A_BOLD)
+    grid.draw(screen, ColorPairs(screen))
+    assert screen.writes == [(0, 0, 'aa', 0), (0, 2, 'bb', 1 << 8), (0, 4, 'aa', 0),
+                             (1, 0, 'aaaaa', 0), (1, 5, 'c', curses.A_BOLD)]
+    assert screen.pair_at(0, 3) == (1, 2) and screen.pair_at(0, 4) is None
+    assert screen.attr_at(1, 5) == curses.A_BOLD
+    assert str(screen) == 'aabbaa\naaaaac'
+
+
+def test_screen_color_pairs():
+    screen = VirtualScreen(3, 5)
+    set_screen(screen)
+    root = HorizontalBox().add_child(Filler('x'))
+    root.resize(3, 4)
+    root.matrix.view(1, 1, 1, 2).fill('y', foreground=3)
+    root.flush()
+    assert screen.pair_at(1, 1) == (3, NO_COLOR)
+    assert screen.pair_at(0, 0) is None
+    clear_screen()
+
+
+def test_colored_steady_state():
+    screen = VirtualScreen(2, 4)
+    grid, pairs = Grid(2, 4), ColorPairs(screen)
+    for frame in range(3):
+        for col, character in enumerate('abcd'):
+            grid[0][col].set(character, foreground=col, background=0, attributes=curses.A_BOLD)
+        grid.draw(screen, pairs)
+        screen.refresh()
+    assert [f.calls for f in screen.frames] == [5, 0, 0]
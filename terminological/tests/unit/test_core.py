@@ -1,12 +1,14 @@
 from itertools import product
+import asyncio
 import pytest
 
 # Terminological Imports
 from terminological.core import gen_matrix, resize_matrix, matrix_to_string
 from terminological.core import string_to_matrix, matrix_slice, INF
 from terminological.core import compute_sizes, HorizontalBox, Filler, MsgLog
-from terminological.core import VerticalBox, OutlineType, start, split
-from terminological.core import screen_to_string, clear_screen
+from terminological.core import VerticalBox, OutlineType, start, split, async_start
+from terminological.core import screen_to_string, clear_screen, LAYOUT_CACHE, ScrollBox
+from terminological.widgets import LabeledProgressBar
 
 
 @pytest.mark.parametrize("string, size, expected", [
@@ -414,3 +416,117 @@ def test_msg_log_rendering():
         clear_screen()
 
     start(B, main)
+
+
+def test_layout_cache():
+    H = HorizontalBox(20, 60)
+    H.add_child(Filler('L')).add_child(VerticalBox().add_child(Filler('1')))
+    LAYOUT_CACHE.reset()
+    H.resize(20, 60)
+    assert (LAYOUT_CACHE.hits, LAYOUT_CACHE.misses) == (2, 0)
+    H.resize(20, 40)
+    assert (LAYOUT_CACHE.hits, LAYOUT_CACHE.misses) == (3, 1)
+    H.children[0].weight = 3
+    H.resize(20, 40)
+    assert (LAYOUT_CACHE.hits, LAYOUT_CACHE.misses) == (4, 2)
+    assert str(H) == '\n'.join(['L' * 30 + '1' * 10 for _ in range(20)])
+
+
+def test_msg_log_large_history():
+    M = MsgLog(10000, 3, 4)
+    for i in range(10001):
+        M.add_message(str(i % 10) * 6)
+    assert len(M.message_history) == 10000
+    assert str(M) == '99  \n0000\n00  '
+    M.resize(3, 6)
+    M.draw()
+    assert str(M) == '888888\n999999\n000000'
+    # only the messages that are on screen have been wrapped again
+    assert sum(1 for w in M._wrapped if w[0] == 6) == 3
+
+
+def test_msg_log_batches():
+    M = MsgLog(8, 4, 4)
+    draws = []
+    draw = M.draw
+    M.draw = lambda: draws.append(1) or draw()
+    M.add_messages(str(i) * 4 for i in range(1, 7))
+    assert str(M) == '3333\n4444\n5555\n6666'
+    assert len(draws) == 1
+    with M.batch():
+        M.add_message('7')
+        with M.batch():
+            M.add_message('8')
+        M.add_message('9')
+        assert str(M) == '3333\n4444\n5555\n6666'
+    assert str(M) == '6666\n7   \n8   \n9   '
+    assert len(draws) == 2
+
+
+def test_async_start():
+    B = HorizontalBox(outline=OutlineType.VerticalBoundBox).add_child(MsgLog())
+    log = B.children[0]
+
+    async def producer(n):
+        for i in range(50):
+            log.add_message('producer {} message {}'.format(n, i))
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(*[producer(n) for n in range(20)])
+        await asyncio.sleep(0.05)
+        assert B.scheduler.frames >= 1
+        assert str(B) == screen_to_string()
+        return len(log.message_history)
+
+    assert asyncio.run(async_start(B, main())) == 200
+    assert B.scheduler is None
+    clear_screen()
+
+
+def test_scroll_box():
+    drawn = []
+
+    class Row(Filler):
+        def draw(self):
+            drawn.append(self)
+            Filler.draw(self)
+
+    S = ScrollBox(5, 3, outline=OutlineType.VerticalBounds)
+    rows = [Row(str(i % 10), min_size=2 if i == 1 else 0) for i in range(5000)]
+    for row in rows:
+        S.add_child(row)
+    assert str(S) == '┌─┐\n000\n111\n111\n└─┘'
+    assert S.visible_children == rows[:2]
+    del drawn[:]
+    S.scroll_by(1)
+    assert str(S) == '┌─┐\n111\n111\n222\n└─┘'
+    # only the rows on screen are drawn, and the one scrolled out has no cells left to draw in
+    assert set(drawn) == {rows[1], rows[2]}
+    assert rows[0].height == 0
+    rows[0].character = 'x'
+    rows[0].invalidate()
+    assert str(S) == '┌─┐\n111\n111\n222\n└─┘'
+    S.scroll_to(10 ** 6)
+    assert S.top == 4997
+    assert str(S) == '┌─┐\n777\n888\n999\n└─┘'
+    S.resize(4, 4)
+    S.scroll_to(0)
+    # a row that does not fit whole is left for the next page, and the rest is padded with blanks
+    assert str(S) == '┌──┐\nxxxx\n    \n└──┘'
+
+
+def test_scroll_box_multi_row_children():
+    S = ScrollBox(7, 10)
+    bars = [LabeledProgressBar(str(i)) for i in range(1000)]
+    for bar in bars:
+        S.add_child(bar)
+    # each bar gets the three rows it draws in, without a minimum that would change its share
+    # of other layouts
+    assert bars[0].min_size == 0
+    assert S.visible_children == bars[:2]
+    assert str(S) == '┌[0]─────┐\n│        │\n└[    0%]┘\n' \
+                     '┌[1]─────┐\n│        │\n└[    0%]┘\n          '
+    S.scroll_to(10 ** 6)
+    bars[-1].update(percentage=50)
+    assert str(S).split('\n')[5] == '└[█  50%]┘'
@@ -0,0 +1,246 @@
+import pytest
+
+# Terminological Imports
+from terminological.grid import Grid, NO_COLOR
+from terminological.core import string_to_matrix, matrix_slice, HorizontalBox, Filler
+from terminological.backends import VirtualScreen
+from terminological.colors import ColorPairs
+
+
+def test_grid_cells():
+    G = Grid(3, 4)
+    assert str(G) == '    \n    \n    '
+    assert G[1][2].set('x')
+    assert G[1][2].character == 'x'
+    assert G[1][-2].character == 'x'
+    assert G[1][2].foreground is None
+    assert str(G) == '    \n  x \n    '
+    with pytest.raises(IndexError):
+        G[3]
+    with pytest.raises(IndexError):
+        G[0][4]
+
+
+def test_grid_fill():
+    G = Grid(3, 4)
+    G.dirty[:] = bytes(12)
+    assert G[0][1:-1].fill('-')
+    assert not G[0][1:-1].fill('-')
+    assert G.dirty == bytearray(b'\x00\x01\x01\x00' + b'\x00' * 8)
+    G.column(3).fill('|')
+    assert str(G) == ' --|\n   |\n   |'
+    G.fill('.')
+    assert str(G) == '....\n....\n....'
+
+
+def test_grid_resize_keeps_contents():
+    G = string_to_matrix('abc\ndef')
+    G.resize(3, 2)
+    assert str(G) == 'ab\nde\n  '
+    G.resize(1, 4)
+    assert str(G) == 'ab  '
+
+
+def test_grid_footprint():
+    G = Grid(100, 300)
+    buffers = [getattr(G, name) for name, _, _ in Grid.BUFFERS]
+    # the back and front buffers, attributes and dirty flags: nothing else is kept per cell
+    assert all(len(buf) == 30000 for buf in buffers)
+    assert sum(getattr(buf, 'itemsize', 1) for buf in buffers) == 25
+    assert G.fg[0] == NO_COLOR
+
+
+def test_grid_views_write_through():
+    G = Grid(6, 8)
+    V = matrix_slice(G, 1, 4, 2, 5)
+    assert (V.row, V.col, V.num_rows, V.num_cols) == (1, 2, 4, 5)
+    W = matrix_slice(V, 1, 2, 1, 10)
+    assert (W.row, W.col, W.num_rows, W.num_cols) == (2, 3, 2, 4)
+    assert W.grid is G
+    W.fill('#')
+    V[0][0].set('@')
+    V[1:-1].column(4).fill('|')
+    assert str(G) == '        \n  @     \n   ###| \n   ###| \n        \n        '
+    assert str(V[1:3]) == ' ###|\n ###|'
+    assert len(matrix_slice(V, 10, 2, 0, 5)) == 0
+
+
+class RecordingScreen(object):
+    def __init__(self):
+        self.calls = []
+
+    def addstr(self, row, col, string, attr=0):
+        self.calls.append((row, col, string))
+
+
+def test_grid_damage_only_flush():
+    G = Grid(50, 200)
+    screen = RecordingScreen()
+    G.draw(screen)
+    assert len(screen.calls) == 50
+    assert not G.damage
+    screen.calls = []
+    G.draw(screen)
+    assert screen.calls == []
+    G[3][7].set('a')
+    G[3][2].set('b')
+    G[3][4].set(' ')
+    G[40][10:13].fill('c')
+    assert G.damage == {3: [2, 8], 40: [10, 13]}
+    G.draw(screen)
+    assert screen.calls == [(3, 2, 'b'), (3, 7, 'a'), (40, 10, 'ccc')]
+
+
+def test_grid_batched_runs():
+    G = Grid(24, 80)
+    screen = RecordingScreen()
+    G.fill('x')
+    G.draw(screen)
+    assert screen.calls == [(r, 0, 'x' * 80) for r in range(24)]
+    screen.calls = []
+    G[5][10:20].fill('y')
+    G[5][30:32].fill('z')
+    G[5][12].set('y', foreground=3)
+    G.draw(screen)
+    assert screen.calls == [(5, 10, 'yy'), (5, 12, 'y'), (5, 13, 'yyyyyyy'), (5, 30, 'zz')]
+
+
+def test_cell_set_change_detection():
+    G = Grid(2, 3)
+    screen = RecordingScreen()
+    G[0][0].set('a', foreground=2, background=0, attributes=1)
+    G.draw(screen)
+    screen.calls = []
+    # setting identical content, colors included, leaves the cell clean
+    assert not G[0][0].set('a', foreground=2, background=0, attributes=1)
+    assert not G[0][0].set('a')
+    assert not G[0][1:3].fill(' ', background=NO_COLOR)
+    G.draw(screen)
+    assert screen.calls == []
+    # 0 is a color like any other
+    assert G[0][0].set('a', foreground=0)
+    assert G[0][0].foreground == 0 and G[0][0].background == 0
+    assert G[1][1].set(' ', force=True)
+    assert G[1][1].character == ' '
+    G.draw(screen)
+    assert screen.calls == [(0, 0, 'a'), (1, 1, ' ')]
+
+
+def test_line_write():
+    G = Grid(2, 8)
+    screen = RecordingScreen()
+    assert G[0].write('hello', 2)
+    assert str(G) == '  hello \n        '
+    G.draw(screen)
+    screen.calls = []
+    # identical text is a no-op, and only the changed stretch is redrawn
+    assert not G[0].write('hello', 2)
+    assert G[0].write('  help there')
+    assert str(G[0]) == '  help t'
+    assert G.damage == {0: [5, 8]}
+    assert G[1][2:4].write('xyz', foreground=1)
+    assert str(G[1]) == '  xy    ' and G[1][3].foreground == 1
+    assert not G[1].write('abc', 8)
+    G.draw(screen)
+    assert screen.calls == [(0, 5, 'p t'), (1, 2, 'xy')]
+    # control characters would move the terminal's cursor, so they are stored as blanks
+    G[0].write('a\tb\x1b[2Jc')
+    assert str(G[0]) == 'a b [2Jc'
+
+
+def test_grid_keeps_capacity():
+    G = string_to_matrix('abc\ndef')
+    G[1][1].set('e', foreground=2)
+    chars = G.chars
+    G.resize(1, 2)
+    assert str(G) == 'ab'
+    G.resize(3, 3)
+    # the storage is reused, and the cells exposed again come back blank
+    assert G.chars is chars
+    assert str(G) == 'ab \n   \n   '
+    assert G[1][1].foreground is None
+    G.resize(3, 5)
+    assert (G.stride, G.capacity) == (5, 3)
+    assert str(G) == 'ab   \n     \n     '
+    G[2][1:].fill('x')
+    G.resize(1, 1)
+    G.resize(3, 5)
+    assert str(G) == 'a    \n     \n     '
+
+
+def test_grid_wide_characters():
+    G = Grid(2, 6)
+    screen = RecordingScreen()
+    assert G[0].write('a中b')
+    assert str(G[0]) == 'a中b  '
+    assert [cell.character for cell in G[0]][:4] == ['a', '中', '', 'b']
+    # a wide character that does not fit is replaced by a blank
+    G[1].write('abcde中')
+    assert str(G[1]) == 'abcde '
+    G.draw(screen)
+    screen.calls = []
+    # overwriting either half of a wide character blanks the other
+    G[0].write('x', 2)
+    assert str(G[0]) == 'a xb  '
+    G[0].write('中文字')
+    G[0].write('y', 1)
+    assert str(G[0]) == ' y文字'
+    G.draw(screen)
+    assert screen.calls == [(0, 0, ' y文字')]
+    # combining marks are kept with their character, and compared with it
+    assert G[1].write('e\u0301x')
+    assert G[1][0].character == 'e\u0301' and str(G[1]) == 'e\u0301xcde '
+    assert not G[1].write('e\u0301x')
+    assert G[1].write('ex')
+    assert str(G[1]) == 'excde '
+    G[1].fill(' ')
+    assert not G.clusters
+
+
+def test_grid_wide_cells_and_fills():
+    G = Grid(2, 6)
+    G[0].write('中中')
+    # setting either half of a wide character blanks the other
+    G[0][2].set('y')
+    assert str(G[0]) == '中y   '
+    G[0][1].set('中')
+    assert str(G[0]) == ' 中   '
+    assert G[0][2].character == ''
+    # there is no room for a wide character in the last column
+    G[0][5].set('中')
+    assert str(G[0]) == ' 中   '
+    G[1].fill('中')
+    assert str(G[1]) == '中中中'
+    G.column(0).fill('中')
+    assert str(G) == ' 中   \n  中中'
+
+
+def test_grid_wide_characters_keep_their_colors():
+    screen = VirtualScreen(1, 7)
+    G = Grid(1, 6)
+    G[0][3:5].fill(' ', foreground=1)
+    G[0].write('ab中de')
+    # the right half takes the colors of the left, so the run is not split in between
+    assert G[0][3].foreground is None
+    G.draw(screen, ColorPairs(screen))
+    assert [write[:3] for write in screen.writes] == [(0, 0, 'ab中'), (0, 4, 'd'), (0, 5, 'e')]
+    assert screen.contents() == ['ab中de ']
+
+
+def test_grid_wide_characters_stay_in_their_view():
+    H = HorizontalBox(1, 6).add_child(Filler('a')).add_child(Filler('b'))
+    left = H.children[0].matrix[0]
+    left[2].set('中')
+    assert str(H) == 'aa bbb'
+    left[1].set('中')
+    assert str(H) == 'a中bbb'
+
+
+def test_grid_fill_clusters():
+    G = Grid(2, 4)
+    G[0].fill('e\u0301')
+    assert str(G[0]) == 'e\u0301' * 4
+    G[1].fill('中\u0301')
+    assert str(G[1]) == '中\u0301' * 2 and G[1][1].character == ''
+    G.fill('x')
+    assert not G.clusters and str(G) == 'xxxx\nxxxx'
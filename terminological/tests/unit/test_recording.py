@@ -0,0 +1,49 @@
+import io
+import json
+
+from terminological.core import VerticalBox, MsgLog, set_screen, clear_screen
+from terminological.widgets import LabeledProgressBar, StrBox
+from terminological.backends import VirtualScreen
+from terminological.recording import Recorder, replay, box_path, find_box
+
+
+def dashboard():
+    return VerticalBox(12, 30)\
+        .add_child(StrBox('status'))\
+        .add_child(MsgLog())\
+        .add_child(LabeledProgressBar('job', min_size=3, max_size=3))
+
+
+def test_record_and_replay():
+    screen = VirtualScreen(12, 31)
+    set_screen(screen)
+    root = dashboard()
+    root.resize(None, None)
+    now = [0.0]
+    trace = io.StringIO()
+    recorder = Recorder(trace, clock=lambda: now[0]).attach(root)
+    log, bar = root.children[1], root.children[2]
+    assert box_path(root, bar) == '2' and find_box(root, '2') is bar
+    for step in range(100):
+        now[0] = step / 100.0
+        log.add_message('line {}'.format(step))
+        bar.update(percentage=step)
+    root.children[0].update('done')
+    log.add_messages('extra {}'.format(i) for i in range(3))
+    now[0] = 1.0
+    screen.resize(10, 41)
+    root.resize(None, None)
+    recorder.detach()
+    assert 'add_message' not in log.__dict__
+    clear_screen()
+    lines = trace.getvalue().splitlines()
+    assert json.loads(lines[0]) == {'size': [12, 31]}
+    assert recorder.events == len(lines) - 1 == 203
+
+    replayed = dashboard()
+    result = replay(lines, replayed, max_fps=30)
+    assert str(replayed) == str(root)
+    assert result.events == 203
+    # at 30 fps, updates 10ms apart make a frame every fourth one, plus one for the resize
+    assert result.frames == 100 // 4 + 1
+    assert result.bytes_per_frame > 0 and result.fps > 0
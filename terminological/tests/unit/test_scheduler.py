@@ -0,0 +1,107 @@
+import threading
+
+from terminological.core import VerticalBox, MsgLog, Filler, set_screen, clear_screen
+from terminological.widgets import LabeledProgressBar
+from terminological.scheduler import RenderScheduler, RenderThread
+from terminological.backends import VirtualScreen
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scheduler_caps_frame_rate():
+    clock = FakeClock()
+    bars = [LabeledProgressBar(str(i)) for i in range(20)]
+    root = VerticalBox(60, 20)
+    [root.add_child(bar) for bar in bars]
+    root.scheduler = RenderScheduler(root, max_fps=10, clock=clock)
+    for step in range(1000):
+        clock.now = step / 1000.0
+        for bar in bars:
+            bar.update(percentage=step % 100)
+    # one second of updates at 10 fps
+    assert root.scheduler.frames == 10
+    assert root.scheduler.pending
+    assert ' 99%]' not in str(root)
+    root.scheduler.render()
+    assert not root.scheduler.pending
+    assert str(root).count(' 99%]') == 20
+
+
+def test_scheduler_coalesces_requests():
+    clock = FakeClock()
+    root = VerticalBox(4, 4)
+    log = MsgLog(8)
+    root.add_child(log)
+    root.scheduler = RenderScheduler(root, max_fps=30, clock=clock)
+    draws = []
+    draw = log.draw
+    log.draw = lambda: draws.append(1) or draw()
+    for i in range(100):
+        log.add_message(str(i))
+    assert len(draws) == 1 and str(root) == '0   \n    \n    \n    '
+    clock.now = 1.0
+    assert root.scheduler.tick()
+    assert not root.scheduler.tick()
+    assert len(draws) == 2 and str(root) == '96  \n97  \n98  \n99  '
+
+
+def test_render_thread_mailbox():
+    root = VerticalBox(6, 12)
+    log = MsgLog(1000)
+    bar = LabeledProgressBar('dl')
+    root.add_child(log).add_child(bar)
+    scheduler = RenderScheduler(root, max_fps=200)
+    root.scheduler = scheduler
+    thread = RenderThread(scheduler)
+    thread.start()
+
+    def worker(n):
+        for i in range(100):
+            scheduler.post(log.add_message, '{}-{}'.format(n, i))
+        scheduler.post(bar.update, percentage=100)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    [w.start() for w in workers]
+    [w.join() for w in workers]
+    thread.stop()
+    assert not thread.is_alive()
+    assert scheduler.thread is None and not scheduler.pending
+    assert len(log.message_history) == 800
+    assert str(root).endswith('100%]┘')
+    assert scheduler.frames >= 1
+
+
+def test_scheduler_coalesces_resizes():
+    clock = FakeClock()
+    screen = VirtualScreen(10, 21)
+    set_screen(screen)
+    layouts = []
+
+    class Root(VerticalBox):
+        def resize(self, new_height=None, new_width=None):
+            layouts.append(screen.getmaxyx())
+            VerticalBox.resize(self, new_height, new_width)
+
+    root = Root()
+    root.add_child(Filler('x'))
+    root.scheduler = RenderScheduler(root, max_fps=10, clock=clock)
+    root.scheduler.on_resize = lambda: screen.clear()
+    del layouts[:]
+    # a terminal edge being dragged: the first resize is laid out right away, the rest of the
+    # frame's worth is merged into one layout pass at the final size
+    for step, size in enumerate(range(5, 10)):
+        clock.now = step / 100.0
+        screen.resize(size, 21)
+        root.scheduler.request_resize()
+    assert layouts == [(5, 21)]
+    clock.now = 0.1
+    root.scheduler.tick()
+    assert layouts == [(5, 21), (9, 21)]
+    assert str(root) == '\n'.join(['x' * 20] * 9)
+    clear_screen()
@@ -0,0 +1,66 @@
+from terminological.core import HorizontalBox, OutlineType
+from terminological.scrollback import ScrollbackLog, INDEX_SUFFIX
+
+
+def test_scrollback_follows_end(tmp_path):
+    M = ScrollbackLog(str(tmp_path / 'log'), 3, 4)
+    M.add_message('1111')
+    M.add_message('2222')
+    assert str(M) == '1111\n2222\n    '
+    M.add_messages(['333333', 'a\tb\nc'])
+    assert str(M) == 'a   \n b  \nc   '
+    assert len(M) == 5
+    assert (tmp_path / 'log').read_text() == '1111\n2222\n333333\na    b\nc\n'
+    M.close()
+
+
+def test_scrollback_scrolling(tmp_path):
+    M = ScrollbackLog(str(tmp_path / 'log'), 3, 4, outline=OutlineType.No)
+    M.add_messages(str(i % 10) * (1 + i % 6) for i in range(100))
+    assert M.line_count == 100 + 16 * 2
+    M.scroll_to(0)
+    assert str(M) == '0   \n11  \n222 '
+    M.scroll_by(4)
+    assert str(M) == '4444\n4   \n5555'
+    # scrolled logs stay put while messages come in
+    M.add_message('new')
+    assert str(M) == '4444\n4   \n5555'
+    M.scroll_to(10 ** 9)
+    assert str(M) == '888 \n9999\nnew '
+    M.scroll_to_end()
+    M.add_message('newer')
+    assert str(M) == 'new \nnewe\nr   '
+    M.close()
+
+
+def test_scrollback_reopen(tmp_path):
+    path = str(tmp_path / 'log')
+    M = ScrollbackLog(path)
+    M.add_messages('message {}'.format(i) for i in range(1000))
+    M.close()
+    # a log written without the index is indexed on open, a cut off last record is completed
+    with open(path, 'a') as log:
+        log.write('extra\nunfinished')
+    index = tmp_path / ('log' + INDEX_SUFFIX)
+    index.write_bytes(index.read_bytes()[:-3])
+    H = HorizontalBox(3, 12).add_child(ScrollbackLog(path))
+    M = H.children[0]
+    assert len(M) == 1002
+    H.resize(3, 12)
+    assert str(M) == 'message 999 \nextra       \nunfinished  '
+    M.scroll_to(998)
+    assert str(M) == 'message 998 \nmessage 999 \nextra       '
+    M.close()
+    assert len(ScrollbackLog(path)) == 1002
+
+
+def test_scrollback_wide_characters(tmp_path):
+    M = ScrollbackLog(str(tmp_path / 'log'), 2, 3)
+    # the second wide character does not fit after 'aa', and the third gets a line of its own
+    M.add_messages(['aa中中', 'xyz'])
+    assert M.line_count == 4
+    M.scroll_to(10 ** 9)
+    assert str(M) == '中 \nxyz'
+    M.scroll_to(1)
+    assert str(M) == '中 \n中 '
+    M.close()
@@ -0,0 +1,58 @@
+from terminological.core import VerticalBox, MsgLog, set_screen, clear_screen
+from terminological.widgets import LabeledProgressBar
+from terminological.backends import VirtualScreen
+from terminological.stats import RenderStats, PHASES
+
+
+def test_render_stats_disabled_by_default():
+    root = VerticalBox(4, 4).add_child(MsgLog())
+    assert root.stats is None
+    assert root.children[0].stats is None
+
+
+def test_render_stats_frames():
+    screen = VirtualScreen(10, 21)
+    set_screen(screen)
+    root = VerticalBox(10, 20)
+    log = MsgLog()
+    bar = LabeledProgressBar('bar', min_size=3, max_size=3)
+    root.add_child(log).add_child(bar)
+    records = []
+    stats = root.enable_stats(callback=records.append)
+    assert log.stats is stats
+
+    del screen.frames[:]
+    root.resize(10, 20)
+    root.draw()
+    bar.update(percentage=50)
+    root.flush()
+    log.add_message('hello')
+    root.flush()
+    clear_screen()
+
+    assert len(records) == 4 and list(stats.frames) == records
+    # every refresh counts as a call on top of the writes themselves
+    assert [r.calls - 1 for r in records] == [f.calls for f in screen.frames]
+    assert [r.cells_flushed for r in records] == [f.cells for f in screen.frames]
+    bar_frame, log_frame = records[2], records[3]
+    # only the progress row of the bar is written again
+    assert bar_frame.cells_touched == 20 - 2
+    assert log_frame.cells_flushed >= 5
+    assert all(log_frame.times[phase] >= 0 for phase in PHASES)
+    assert log_frame.times['content'] > 0 and log_frame.times['output'] > 0
+    root.disable_stats()
+    assert root.stats is None
+
+
+def test_render_stats_nested_phases():
+    now = [0.0]
+    stats = RenderStats(clock=lambda: now[0])
+    stats.enter('content')
+    now[0] = 1.0
+    stats.enter('diff')
+    now[0] = 3.0
+    stats.exit()
+    now[0] = 6.0
+    stats.exit()
+    frame = stats.end_frame()
+    assert frame.times['content'] == 4.0 and frame.times['diff'] == 2.0
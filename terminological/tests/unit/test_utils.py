@@ -1,4 +1,28 @@
-from terminological.utils import fit_to_length
+import random
+import pytest
+
+from terminological.utils import fit_to_length, compute_sizes, gcd_of, INF
+from terminological.utils import split, clip, clip_end, string_width
+
+
+def unit_step_compute_sizes(dimension_list, total_size):
+    """The original round-by-round implementation of compute_sizes, kept as a reference."""
+    sizes = [min_s for _, _, min_s, _ in dimension_list]
+    scalar = gcd_of({weight for _, weight, _, _ in dimension_list})
+    weights = [round(weight / scalar, 0) for _, weight, _, _ in dimension_list]
+    maxes = [max_s for _, _, _, max_s in dimension_list]
+    size = sum(sizes)
+    while any(min(w, m - s) for w, m, s in zip(weights, maxes, sizes)):
+        for i, weight in enumerate(weights):
+            if size >= total_size:
+                return sizes
+            delta = min(weight, maxes[i] - sizes[i])
+            sizes[i] += delta
+            size += delta
+            if size > total_size:
+                sizes[i] -= size - total_size
+                return sizes
+    return sizes
 
 def test_fit_to_length():
     string = 'abcdefghijklmnopqrstuvwxyz'
@@ -34,3 +58,38 @@ def test_fit_to_length():
     assert fit_to_length(string, 30, left_cap='[') == '[' + string + '   '
     assert fit_to_length(string, 30, right_cap=']') == string + '   ]'
     assert fit_to_length(string, 30) == string + '    '
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_compute_sizes_matches_unit_steps(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        dimension_list = []
+        for _ in range(rng.randint(1, 8)):
+            min_s = rng.choice([0, 0, rng.randint(0, 20)])
+            max_s = rng.choice([INF, min_s + rng.randint(0, 60)])
+            weight = rng.choice([1, 1, 2, 3, rng.randint(1, 100)])
+            dimension_list.append((None, weight, min_s, max_s))
+        total_size = rng.randint(-2, 500)
+        sizes = [t[0] for t in compute_sizes(dimension_list, total_size)]
+        assert sizes == unit_step_compute_sizes(dimension_list, total_size)
+
+
+def test_compute_sizes_skewed_weights():
+    dimension_list = [(None, 1, 0, INF), (None, 97, 0, INF)]
+    assert [t[0] for t in compute_sizes(dimension_list, 10 ** 6)] == \
+        unit_step_compute_sizes(dimension_list, 10 ** 6)
+
+
+def test_wide_and_combining_characters():
+    assert string_width('abc') == 3
+    assert string_width('中文') == 4
+    assert string_width('e\u0301') == 1
+    assert string_width('👍') == 2
+    # a wide character never straddles the end of a line
+    assert split('ab中文', 3) == ['ab', '中', '文']
+    assert split('e\u0301e\u0301e', 2) == ['e\u0301e\u0301', 'e']
+    assert clip('中文字', 5) == '中文 '
+    assert clip('中文字', 5, '') == '中文'
+    assert clip_end('中文字', 5) == ' 文字'
+    assert clip('abc', 5) == 'abc  '
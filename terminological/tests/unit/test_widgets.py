@@ -1,6 +1,7 @@
 from terminological.widgets import StrBox
-from terminological.core import OutlineType
+from terminological.core import OutlineType, set_screen, clear_screen
 from terminological.widgets import LabeledProgressBar
+from terminological.backends import VirtualScreen
 
 
 def box_top(length):
@@ -45,3 +46,31 @@ def test_labeled_progress_bar():
     assert str(progress_bar) == "┌[]──────┐\n│        │\n└[    0%]┘"
     progress_bar.update(0, 'a', 'b')
     assert str(progress_bar) == "┌[a]─────┐\n│b       │\n└[    0%]┘"
+
+
+def test_unchanged_updates_touch_nothing():
+    screen = VirtualScreen(3, 12)
+    progress_bar = LabeledProgressBar('title', 'message', width=12)
+    progress_bar.update(percentage=10)
+    progress_bar.draw()
+    progress_bar.matrix.draw(screen)
+    progress_bar.update(10, 'title', 'message')
+    assert not progress_bar.matrix.grid.damage
+    # a new message only redraws the message row
+    progress_bar.update(10, 'title', 'other')
+    assert list(progress_bar.matrix.grid.damage) == [1]
+    assert str(progress_bar) == "┌[title]───┐\n│other     │\n└[     10%]┘"
+
+    box = StrBox('a\nb', 2, 3)
+    box.matrix.draw(screen)
+    box.update('a\nb')
+    assert not box.matrix.grid.damage
+    box.update('a\nc')
+    assert box.matrix.grid.damage == {1: [0, 1]}
+
+    # a base box is still put on screen by its own updates
+    set_screen(screen)
+    box = StrBox('one', 1, 3)
+    box.update('two')
+    clear_screen()
+    assert screen.contents()[0].startswith('two')
@@ -1,30 +1,114 @@
-from math import gcd
-from functools import reduce
+import unicodedata
+from math import gcd, ceil
+from functools import reduce, lru_cache
 
 # Constants
 INF = float('inf')
 
 
+class CacheStats(object):
+    """Hit and miss counters for a cache."""
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return 'CacheStats(hits={}, misses={})'.format(self.hits, self.misses)
+
+
 def matrix_to_string(matrix):
-    return '\n'.join([''.join([c.character for c in row]) for row in matrix])
+    return '\n'.join([str(row) for row in matrix])
 
 
 def matrix_slice(matrix, row_start, row_len, col_start, col_len):
-    return [r[col_start:col_start + col_len]
-            for r in matrix[row_start:row_start + row_len]]
+    return matrix.view(row_start, row_len, col_start, col_len)
 
 
 def gcd_of(collection):
     return reduce(gcd, collection)
 
 
+@lru_cache(maxsize=4096)
+def _char_width(char):
+    if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf', 'Cc'):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def char_width(char):
+    """Returns the number of terminal columns a character takes up: 0 for combining marks and
+       other characters that attach to the one before, 2 for wide (mostly CJK) characters and
+       emoji, and 1 for everything else. Printable ASCII never gets past a range check, and the
+       lookups for everything else are kept in a bounded LRU cache."""
+    return 1 if ' ' <= char <= '~' else _char_width(char)
+
+
+def string_width(string):
+    """Returns the number of terminal columns a string takes up."""
+    if string.isascii():
+        return len(string)
+    return sum(map(char_width, string))
+
+
+def clip(string, width, filler=' '):
+    """Returns the longest start of the string that fits in the given number of columns, padded
+       with filler to exactly that many. A wide character that would straddle the end is left out
+       and replaced by padding."""
+    if width <= 0:
+        return ''
+    if string.isascii():
+        string = string[:width]
+        return string + filler * (width - len(string))
+    used = 0
+    for end, char in enumerate(string):
+        char_columns = char_width(char)
+        if used + char_columns > width:
+            return string[:end] + filler * (width - used)
+        used += char_columns
+    return string + filler * (width - used)
+
+
+def clip_end(string, width, filler=' '):
+    """Like clip(), but keeps the end of the string and pads it at the start."""
+    if width <= 0:
+        return ''
+    if string.isascii():
+        string = string[-width:]
+        return filler * (width - len(string)) + string
+    used = 0
+    for start in range(len(string) - 1, -1, -1):
+        char_columns = char_width(string[start])
+        if used + char_columns > width:
+            return filler * (width - used) + string[start + 1:]
+        used += char_columns
+    return filler * (width - used) + string
+
+
 def split(string, size):
+    """Splits the string at its line breaks, and wraps each line into pieces of at most size
+       columns. Wide characters are never split across pieces, and combining marks stay with the
+       character they follow."""
     if size == 0:
         return [string]
     strings = string.replace('\t', '    ').split('\n')
     result = []
     for substring in strings:
-        result.extend([substring[i:i+size] for i in range(0, len(substring), size)])
+        if substring.isascii():
+            result.extend([substring[i:i+size] for i in range(0, len(substring), size)])
+            continue
+        start = used = 0
+        for end, char in enumerate(substring):
+            char_columns = char_width(char)
+            if used + char_columns > size and end > start:
+                result.append(substring[start:end])
+                start, used = end, 0
+            used += char_columns
+        if start < len(substring):
+            result.append(substring[start:])
     return result
 
 
@@ -32,14 +116,22 @@ def fit_to_length(string: str, length: int,
                   left_cap: str = None, right_cap: str = None,
                   filler: str = None):
     """Given a string and a length, this function either pads it with a filler character (' ' by
-       default) or truncates it. Can also be given left and right end-cap characters."""
+       default) or truncates it. Can also be given left and right end-cap characters. Lengths are
+       in terminal columns."""
     left_cap = left_cap[0] if left_cap is not None else ''
     right_cap = right_cap[0] if right_cap is not None else ''
     filler = filler if filler is not None else ' '
 
-    result = left_cap + string + (filler * (length - (len(string) + len(left_cap) + \
-             len(right_cap)))) + right_cap
+    result = left_cap + string + (filler * (length - (string_width(string) + \
+             string_width(left_cap) + string_width(right_cap)))) + right_cap
 
+    if not result.isascii():
+        if length <= 6:
+            return clip(result, length-1 if right_cap else length) + right_cap
+        if length < string_width(result):
+            return clip(result, length-5 if right_cap else length-4) + '...' + \
+                   clip_end(result, 2 if right_cap else 1)
+        return result
     if length <= 6:
         return result[:(length-1 if right_cap else length)] + (result[-1] if right_cap else '')
     else:
@@ -62,10 +154,22 @@ class SizeDef(object):
         self.size += delta
         return delta
 
+    def grow_rounds(self, rounds):
+        """Applies the given number of grow() calls in one step."""
+        if rounds > 0 and self.delta > 0:
+            self.size = min(self.size + rounds * self.scaled_weight, self.max_s)
+
     @property
     def delta(self):
         return min(self.scaled_weight, self.max_s - self.size)
 
+    @property
+    def rounds_to_max(self):
+        """Property, how many grow() calls it takes for this definition to reach its max size."""
+        if self.max_s == INF:
+            return INF
+        return ceil((self.max_s - self.size) / self.scaled_weight)
+
     @property
     def tup(self):
         return (self.size, self.weight, self.min_s, self.max_s)
@@ -74,22 +178,52 @@ class SizeDef(object):
         self.scaled_weight = round(self.weight / scalar, 0)
 
 
+def full_rounds(definitions, remaining):
+    """Returns how many complete rounds of growing every definition by its scaled weight fit into
+       the remaining space without filling it. Between two definitions reaching their max the total
+       grows linearly with the number of rounds, so each segment is solved directly instead of
+       stepping through it. If everything reaches its max first, that number of rounds is returned."""
+    growing = sorted((d for d in definitions if d.delta > 0),
+                     key=lambda d: (d.max_s - d.size) / d.scaled_weight)
+    weight = sum(d.scaled_weight for d in growing)
+    grown = 0
+    rounds = 0
+    for size_def in growing:
+        limit = size_def.rounds_to_max
+        if limit > rounds:
+            # first round count that would use up the remaining space in this segment
+            needed = ceil((remaining - grown) / weight)
+            if needed < limit:
+                return max(needed, rounds) - 1
+            rounds = limit
+        grown += size_def.max_s - size_def.size
+        weight -= size_def.scaled_weight
+    return rounds - 1 if grown >= remaining else rounds
+
+
 def compute_sizes(dimension_list, total_size):
+    """Distributes total_size between the given (size, weight, min, max) definitions. Every
+       definition starts at its min size and then, round after round and in order, grows by its
+       weight (divided by the gcd of all the weights) until it hits its max or the total is used
+       up. The number of complete rounds is solved for in O(n log n), after which only the final
+       partial round is stepped through."""
     definitions = [SizeDef(*t) for t in dimension_list]
+    if not definitions:
+        return []
     scalar = gcd_of({d.weight for d in definitions})
     [d.scale(scalar) for d in definitions]
 
-    # grow each element according to weight until we cannot grow further
     size = sum(d.size for d in definitions)
-    while 42:
-        if any(d.delta for d in definitions):
-            for size_def in definitions:
-                if size < total_size:
-                    size += size_def.grow()
-                    if size > total_size:
-                        size_def.size -= size - total_size
-                        return [d.tup for d in definitions]
-                else:
-                    return [d.tup for d in definitions]
-        else:
-            return [d.tup for d in definitions]
+    if size < total_size:
+        rounds = full_rounds(definitions, total_size - size)
+        [d.grow_rounds(rounds) for d in definitions]
+        size = sum(d.size for d in definitions)
+    # finish off the last, partial round
+    for size_def in definitions:
+        if size >= total_size:
+            break
+        size += size_def.grow()
+        if size > total_size:
+            size_def.size -= size - total_size
+            break
+    return [d.tup for d in definitions]
@@ -1,5 +1,5 @@
 from .core import HorizontalBox, OutlineType, Box
-from .utils import INF
+from .utils import INF, clip, string_width
 
 
 class StringFiller(Box):
@@ -11,8 +11,13 @@ class StringFiller(Box):
         self.set(string)
 
     def set(self, new_string):
-        self._string = new_string.split('\n') if new_string is not None \
-                       else self._string
+        """Sets the string to display. Returns True if it differs from the current one."""
+        if new_string is None:
+            return False
+        lines = new_string.split('\n')
+        changed = lines != getattr(self, '_string', None)
+        self._string = lines
+        return changed
 
     def resize(self, new_height, new_width):
         Box.resize(self, new_height, new_width)
@@ -23,12 +28,10 @@ class StringFiller(Box):
 
     def draw(self):
         Box.draw(self)
-        for row_idx in range(self.num_rows):
-            for col_idx in range(self.num_cols):
-                if row_idx < len(self._string) and col_idx < len(self._string[row_idx]):
-                    self.matrix[row_idx][col_idx].set(self._string[row_idx][col_idx])
-                else:
-                    self.matrix[row_idx][col_idx].set(' ')
+        width = self.num_cols
+        for row_idx, row in enumerate(self.matrix):
+            line = self._string[row_idx] if row_idx < len(self._string) else ''
+            row.write(clip(line, width))
 
 
 class StrBox(HorizontalBox):
@@ -42,28 +45,40 @@ class StrBox(HorizontalBox):
         self.add_child(self.string_filler)
 
     def update(self, new_string=None):
-        self.string_filler.set(new_string)
-        self.draw()
+        if self.string_filler.set(new_string):
+            self.invalidate(self.string_filler.draw)
 
     def draw(self):
         HorizontalBox.draw(self)
 
 
 class LabeledProgressBar(HorizontalBox):
+    natural_height = 3
+
     def __init__(self, title, message=None, width=0, parent_box=None,
                  matrix=None, weight=1, max_size=INF, min_size=0, outline=OutlineType.No):
         self.title = title
         self.message = message
         self.percentage = 0
-        HorizontalBox.__init__(self, height=3, width=width, parent_box=parent_box,
+        HorizontalBox.__init__(self, height=self.natural_height, width=width, parent_box=parent_box,
                                matrix=matrix, weight=weight, max_size=max_size, min_size=min_size,
                                outline=OutlineType.HorizontalBounds)
 
     def update(self, percentage=None, title=None, message=None):
-        self.title = title if title is not None else self.title
-        self.message = message if message is not None else self.message
-        self.percentage = percentage if percentage is not None else self.percentage
-        self.draw()
+        """Updates the parts of the bar that are given. Parts equal to what is shown are ignored,
+           and only the rows of the parts that changed are drawn again."""
+        rows = []
+        if title is not None and title != self.title:
+            self.title = title
+            rows.append(self._draw_title)
+        if message is not None and message != self.message:
+            self.message = message
+            rows.append(self._draw_message)
+        if percentage is not None and percentage != self.percentage:
+            self.percentage = percentage
+            rows.append(self._draw_progress)
+        if rows:
+            self.invalidate(lambda: [draw_row() for draw_row in rows])
 
     def stretch(self, new_width=None):
         HorizontalBox.resize(self, new_width=new_width)
@@ -79,26 +94,32 @@ class LabeledProgressBar(HorizontalBox):
         msg_max = width
         if not self.message:
             return ' ' * msg_max
-        return self.message[:msg_max] + ' ' * (msg_max - len(self.message))
+        return clip(self.message, msg_max)
 
     def _gen_title_bar(self, width):
         msg_max = width - 2
         if not self.title:
             return '[]' + '─' * msg_max
-        return '[' + self.title[:msg_max] + ']' + '─' * (msg_max - len(self.title))
+        title = clip(self.title, msg_max, '')
+        return '[' + title + ']' + '─' * (msg_max - string_width(title))
+
+    def _draw_title(self):
+        height, width, h_offset, v_offset = self._outline_offsets()
+        self.matrix[v_offset].write(self._gen_title_bar(width), h_offset)
+
+    def _draw_message(self):
+        height, width, h_offset, v_offset = self._outline_offsets()
+        self.matrix[v_offset + 1].write(self._gen_message_bar(width), h_offset)
+
+    def _draw_progress(self):
+        height, width, h_offset, v_offset = self._outline_offsets()
+        self.matrix[height - 1].write(self._gen_progress_bar(width), h_offset)
 
     def draw(self):
         Box.draw(self)
-        height, width, h_offset, v_offset = self._outline_offsets()
-        title_row = self.matrix[v_offset]
-        message_row = self.matrix[v_offset + 1]
-        progress_row = self.matrix[height - 1]
-        [progress_row[i+h_offset].set(c)
-         for i, c in enumerate(self._gen_progress_bar(width)) if i+h_offset < len(progress_row)]
-        [message_row[i+h_offset].set(c)
-         for i, c in enumerate(self._gen_message_bar(width)) if i+h_offset < len(message_row)]
-        [title_row[i+h_offset].set(c)
-         for i, c in enumerate(self._gen_title_bar(width)) if i+h_offset < len(title_row)]
+        self._draw_progress()
+        self._draw_message()
+        self._draw_title()
 
 # class TreePrinterNode(object):
 #     def __init__(self, string):